@@ -1,12 +1,21 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from flask_socketio import SocketIO, emit
-from stock_manager import StockManager, AlertType, AlertStatus
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify, abort
+from flask_socketio import SocketIO, ConnectionRefusedError, emit, join_room
+from stock_manager import StockManager, AlertType, AlertStatus, QuotaExceededError
+from quote_cache import QuoteCache
+from fetch_queue import FetchQueue, FetchPriority, FetchTimeoutError
+from tenants import TenantRegistry, DEFAULT_TENANT
+from message_bus import create_message_bus, default_worker_id
+from response_cache import ResponseCache
+from concurrency import patched_by
+from export import (EXPORT_FORMATS, WATCHLIST_COLUMNS, ALERT_COLUMNS, HISTORY_COLUMNS,
+                    export_chunks, watchlist_rows, alert_rows, history_rows, watchlist_symbols)
 from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime
+from dataclasses import asdict
 import os
 from dotenv import load_dotenv
-import threading
 import time
+import atexit
 
 # Load environment variables
 load_dotenv()
@@ -14,25 +23,170 @@ load_dotenv()
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'supersecretkey_change_in_production')
 
-# Initialize SocketIO for real-time communication
-socketio = SocketIO(app, cors_allowed_origins="*")
-
-# Initialize StockManager
-stock_manager = StockManager()
+# Initialize SocketIO for real-time communication.
+# SOCKETIO_ASYNC_MODE selects the worker (threading, eventlet, gevent). It
+# defaults to threading: eventlet/gevent only work once monkey-patched, which
+# serve.py does before setting the mode.
+# SOCKETIO_MESSAGE_QUEUE (e.g. redis://localhost:6379/0) lets several worker
+# processes share broadcasts; one elected worker does all upstream fetching.
+MESSAGE_QUEUE_URL = os.getenv('SOCKETIO_MESSAGE_QUEUE') or None
+ASYNC_MODE = os.getenv('SOCKETIO_ASYNC_MODE') or 'threading'
+if ASYNC_MODE in ('eventlet', 'gevent') and patched_by() != ASYNC_MODE:
+    print(f"SOCKETIO_ASYNC_MODE={ASYNC_MODE} needs monkey patching (use serve.py); "
+          f"falling back to threading")
+    ASYNC_MODE = 'threading'
+socketio = SocketIO(app, cors_allowed_origins="*",
+                    async_mode=ASYNC_MODE,
+                    message_queue=MESSAGE_QUEUE_URL)
+
+# Shared state for multi-worker mode (in-process stand-in when no queue is set)
+message_bus = create_message_bus(MESSAGE_QUEUE_URL)
+WORKER_ID = default_worker_id()
+# 'auto' workers compete for the fetcher lease; 'web' workers only fan out
+WORKER_ROLE = os.getenv('WORKER_ROLE', 'auto')
+LEADER_LEASE_SECONDS = int(os.getenv('LEADER_LEASE_SECONDS', 90))
+
+# Pre-serialized JSON API responses; TTLs follow how often the data refreshes
+response_cache = ResponseCache()
+QUOTE_CACHE_TTL = int(os.getenv('STOCK_UPDATE_INTERVAL', 30))
+HISTORY_CACHE_TTL = int(os.getenv('HISTORY_CACHE_TTL', 300))
+
+# Warm restart: the fetcher periodically snapshots quotes and the alert index;
+# on startup they are restored and refreshed gradually over the catch-up window
+SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH', 'data/state.snapshot')
+SNAPSHOT_INTERVAL = int(os.getenv('SNAPSHOT_INTERVAL', 60))
+SNAPSHOT_CATCHUP_SECONDS = int(os.getenv('SNAPSHOT_CATCHUP_SECONDS', 120))
+
+# Lets load_test.py trigger timestamped broadcasts; keep disabled in production
+app.config['LATENCY_PROBE_ENABLED'] = os.getenv('ENABLE_LATENCY_PROBE', 'False').lower() == 'true'
+
+# Per-user watchlists and alerts. The user id comes from TENANT_HEADER (set by
+# the auth proxy in front of the app); requests without it use the default
+# tenant, which keeps the original data/stocks.csv and data/alerts.csv.
+TENANT_HEADER = os.getenv('TENANT_HEADER', 'X-User-Id')
+MAX_STOCKS_PER_USER = int(os.getenv('MAX_STOCKS_PER_USER', 0)) or None
+MAX_ALERTS_PER_USER = int(os.getenv('MAX_ALERTS_PER_USER', 0)) or None
+
+# Upstream fetches go through a priority queue: user requests jump ahead of
+# background refreshes, FETCH_RESERVED_INTERACTIVE workers never run background
+# jobs, and identical in-flight fetches are coalesced into one provider call
+FETCH_WORKERS = int(os.getenv('FETCH_WORKERS', 4))
+FETCH_RESERVED_INTERACTIVE = int(os.getenv('FETCH_RESERVED_INTERACTIVE', 1))
+INTERACTIVE_FETCH_TIMEOUT = float(os.getenv('INTERACTIVE_FETCH_TIMEOUT', 10))
+fetch_queue = FetchQueue(workers=FETCH_WORKERS, reserved_interactive=FETCH_RESERVED_INTERACTIVE)
+quote_cache = QuoteCache(ttl=QUOTE_CACHE_TTL, fetch_queue=fetch_queue)
+tenants = TenantRegistry(quote_cache=quote_cache,
+                         max_stocks=MAX_STOCKS_PER_USER,
+                         max_alerts=MAX_ALERTS_PER_USER)
 
 # Background scheduler for periodic price checks
 scheduler = BackgroundScheduler()
 scheduler.start()
 
-# Global variables for real-time updates
-connected_clients = set()
+# Global variables for real-time updates (sid -> tenant id)
+connected_clients = {}
+background_tasks_started = False
+
+
+def call_provider(func, *args, **kwargs):
+    """Run a blocking provider call without stalling the async worker.
+
+    Under eventlet/gevent the provider SDKs (yfinance, finnhub, alpha_vantage)
+    can still block the whole hub in C code, so they are pushed onto the
+    native thread pool and the calling green thread yields until they finish.
+    """
+    if socketio.async_mode == 'eventlet':
+        from eventlet import tpool
+        return tpool.execute(func, *args, **kwargs)
+    if socketio.async_mode == 'gevent':
+        from gevent import get_hub
+        return get_hub().threadpool.apply(func, args, kwargs)
+    return func(*args, **kwargs)
+
+
+def fetch_interactive(key, func, *args):
+    """Run a user-initiated provider call ahead of background work.
+
+    Raises FetchTimeoutError after INTERACTIVE_FETCH_TIMEOUT seconds.
+    """
+    return call_provider(fetch_queue.call, key, func, *args,
+                         priority=FetchPriority.INTERACTIVE, timeout=INTERACTIVE_FETCH_TIMEOUT)
+
+
+def is_fetcher():
+    """Whether this worker holds the lease to poll providers and evaluate alerts"""
+    if WORKER_ROLE == 'web':
+        return False
+    return message_bus.acquire_leadership(WORKER_ID, LEADER_LEASE_SECONDS)
+
+
+def current_tenant() -> str:
+    """Tenant id for the current request or socket connection"""
+    tenant_id = request.headers.get(TENANT_HEADER) or DEFAULT_TENANT
+    try:
+        return TenantRegistry.validate(tenant_id)
+    except ValueError:
+        abort(400)
+
+
+def get_manager() -> StockManager:
+    """StockManager holding the current tenant's watchlist and alerts"""
+    return tenants.get(current_tenant())
+
+
+def tenant_room(tenant_id: str) -> str:
+    return f"tenant:{tenant_id}"
+
+
+def current_stocks(tenant_id: str):
+    """Latest watchlist data, served from the elected fetcher when scaled out"""
+    manager = tenants.get(tenant_id)
+    if message_bus.distributed:
+        stocks = message_bus.get_snapshot(f'stocks:{tenant_id}')
+        return stocks if stocks is not None else manager.load_stocks()
+    return call_provider(manager.get_all_stocks)
+
+
+def watchlist_changed(tenant_id: str):
+    """Drop cached watchlist views after an add or remove so the change shows at once"""
+    response_cache.invalidate(f'watchlist:{tenant_id}')
+    if message_bus.distributed:
+        message_bus.publish_snapshot(f'stocks:{tenant_id}', tenants.get(tenant_id).stocks)
+
+
+def alert_event(alert) -> dict:
+    """Payload for the 'alert_triggered' socket event"""
+    return {
+        'symbol': alert.symbol,
+        'message': alert.message,
+        'threshold': alert.threshold,
+        'alert_type': alert.alert_type.value,
+        'sound_enabled': alert.sound_enabled,
+        'notification_enabled': alert.notification_enabled,
+        'triggered_at': alert.triggered_at
+    }
+
+
+@app.before_request
+def sync_shared_state():
+    """Pick up CSV changes made by other workers.
+
+    Mutations always re-read so workers don't clobber each other; reads only
+    re-read files that changed, e.g. alerts triggered by the elected fetcher.
+    """
+    if not message_bus.distributed:
+        return
+    if request.method == "POST":
+        get_manager().reload()
+    else:
+        get_manager().reload_if_changed()
 
 
 @app.route("/")
 def index():
     """Main dashboard showing all stocks"""
-    stocks = stock_manager.get_all_stocks()
-    active_alerts = stock_manager.get_active_alerts()
+    stocks = current_stocks(current_tenant())
+    active_alerts = get_manager().get_active_alerts()
     return render_template("index.html", stocks=stocks, active_alerts=active_alerts)
 
 
@@ -45,11 +199,21 @@ def add_stock():
         flash("Please enter a stock symbol.", "error")
         return redirect(url_for("index"))
     
-    success = stock_manager.add_stock(symbol)
+    tenant_id = current_tenant()
+    try:
+        success = call_provider(tenants.get(tenant_id).add_stock, symbol, INTERACTIVE_FETCH_TIMEOUT)
+    except QuotaExceededError as e:
+        flash(f"Failed to add {symbol.upper()}: {e}.", "error")
+        return redirect(url_for("index"))
+    except FetchTimeoutError:
+        flash(f"Failed to add {symbol.upper()}: the data provider is not responding. Please try again.", "error")
+        return redirect(url_for("index"))
+    
     if success:
         flash(f"Successfully added {symbol.upper()} to your watchlist!", "success")
-        # Emit real-time update to all connected clients
-        socketio.emit('stock_added', {'symbol': symbol.upper()})
+        # Emit real-time update to the user's connected clients
+        watchlist_changed(tenant_id)
+        socketio.emit('stock_added', {'symbol': symbol.upper()}, to=tenant_room(tenant_id))
     else:
         flash(f"Failed to add {symbol.upper()}. Check if the symbol is valid or already exists.", "error")
     
@@ -59,10 +223,12 @@ def add_stock():
 @app.route("/remove_stock/<symbol>", methods=["POST"])
 def remove_stock(symbol):
     """Remove a stock from the watchlist"""
-    success = stock_manager.remove_stock(symbol)
+    tenant_id = current_tenant()
+    success = tenants.get(tenant_id).remove_stock(symbol)
     if success:
         flash(f"Removed {symbol} from your watchlist.", "success")
-        socketio.emit('stock_removed', {'symbol': symbol})
+        watchlist_changed(tenant_id)
+        socketio.emit('stock_removed', {'symbol': symbol}, to=tenant_room(tenant_id))
     else:
         flash(f"Failed to remove {symbol}.", "error")
     
@@ -72,8 +238,9 @@ def remove_stock(symbol):
 @app.route("/alerts")
 def alerts():
     """Alerts management page"""
-    active_alerts = stock_manager.get_active_alerts()
-    triggered_alerts = stock_manager.get_triggered_alerts()
+    manager = get_manager()
+    active_alerts = manager.get_active_alerts()
+    triggered_alerts = manager.get_triggered_alerts()
     alert_types = [alert_type.value for alert_type in AlertType]
     
     return render_template("alerts.html", 
@@ -93,7 +260,7 @@ def add_alert():
         notification_enabled = request.form.get("notification_enabled", "on") == "on"
         message = request.form.get("message", "").strip()
         
-        alert_id = stock_manager.add_alert(
+        alert_id = get_manager().add_alert(
             symbol=symbol,
             alert_type=alert_type,
             threshold=threshold,
@@ -115,7 +282,7 @@ def add_alert():
 @app.route("/disable_alert/<alert_id>", methods=["POST"])
 def disable_alert(alert_id):
     """Disable an alert"""
-    success = stock_manager.disable_alert(alert_id)
+    success = get_manager().disable_alert(alert_id)
     if success:
         flash("Alert disabled successfully.", "success")
     else:
@@ -127,22 +294,48 @@ def disable_alert(alert_id):
 @app.route("/api/stock/<symbol>")
 def get_stock_data(symbol):
     """API endpoint to get current stock data"""
-    stock_data = stock_manager.fetch_comprehensive_stock_data(symbol)
-    if stock_data:
-        return jsonify(stock_data.__dict__)
-    else:
-        return jsonify({"error": "Stock not found"}), 404
+    cache_key = f"stock:{symbol.upper()}"
+    entry = response_cache.get(cache_key)
+    if entry is None:
+        try:
+            stock_data = call_provider(get_manager().get_quote, symbol,
+                                       FetchPriority.INTERACTIVE, INTERACTIVE_FETCH_TIMEOUT)
+        except FetchTimeoutError:
+            return jsonify({"error": "Data provider timed out"}), 504
+        if not stock_data:
+            return jsonify({"error": "Stock not found"}), 404
+        entry = response_cache.put(cache_key, stock_data.__dict__, QUOTE_CACHE_TTL)
+    return response_cache.respond(entry, request)
 
 
 @app.route("/api/stock/<symbol>/history")
 def get_stock_history(symbol):
-    """API endpoint to get stock price history"""
+    """API endpoint to get stock price history.
+
+    `points` downsamples to at most that many bars; `format=binary` returns
+    the compact columnar payload described in chart_data.py.
+    """
     period = request.args.get('period', '1mo')
-    history = stock_manager.get_stock_history(symbol, period)
-    if history:
-        return jsonify(history)
-    else:
-        return jsonify({"error": "History not available"}), 404
+    max_points = request.args.get('points', type=int)
+    binary = request.args.get('format') == 'binary'
+    cache_key = f"history:{symbol.upper()}:{period}:{max_points}:{'bin' if binary else 'json'}"
+    entry = response_cache.get(cache_key)
+    if entry is None:
+        try:
+            history = fetch_interactive(f"history:{symbol.upper()}:{period}:{max_points}",
+                                        get_manager().get_history_columns, symbol, period, max_points)
+        except FetchTimeoutError:
+            return jsonify({"error": "Data provider timed out"}), 504
+        if history is None:
+            return jsonify({"error": "History not available"}), 404
+        # Intraday bars move as fast as quotes; daily bars can be cached longer
+        ttl = QUOTE_CACHE_TTL if period in ('1d', '5d') else HISTORY_CACHE_TTL
+        if binary:
+            entry = response_cache.put_bytes(cache_key, history.to_bytes(), ttl,
+                                             mimetype='application/octet-stream')
+        else:
+            entry = response_cache.put(cache_key, history.to_dict(), ttl)
+    return response_cache.respond(entry, request)
 
 
 @app.route("/api/search")
@@ -152,33 +345,79 @@ def search_stocks():
     if not query:
         return jsonify([])
     
-    results = stock_manager.search_stocks(query)
+    try:
+        results = fetch_interactive(f"search:{query.upper()}", get_manager().search_stocks, query)
+    except FetchTimeoutError:
+        return jsonify({"error": "Data provider timed out"}), 504
     return jsonify(results)
 
 
 @app.route("/api/watchlist")
 def get_watchlist():
     """API endpoint to get current watchlist"""
-    stocks = stock_manager.get_all_stocks()
-    return jsonify(stocks)
+    tenant_id = current_tenant()
+    cache_key = f'watchlist:{tenant_id}'
+    entry = response_cache.get(cache_key)
+    if entry is None:
+        entry = response_cache.put(cache_key, current_stocks(tenant_id), QUOTE_CACHE_TTL)
+    return response_cache.respond(entry, request)
+
+
+def export_response(name, rows, columns):
+    """Stream rows as a download in the requested ?format= (csv, ndjson, parquet)"""
+    fmt = request.args.get('format', 'csv')
+    try:
+        chunks = export_chunks(rows, columns, fmt)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 501
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    return Response(chunks, mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={name}.{extension}'})
+
+
+@app.route("/api/export/watchlist")
+def export_watchlist():
+    """Download the watchlist as last fetched, without triggering a refresh"""
+    return export_response('watchlist', watchlist_rows(get_manager(), quote_cache), WATCHLIST_COLUMNS)
+
+
+@app.route("/api/export/alerts")
+def export_alerts():
+    """Download every alert with its status and trigger time"""
+    return export_response('alerts', alert_rows(get_manager()), ALERT_COLUMNS)
+
+
+@app.route("/api/export/history")
+def export_history():
+    """Download OHLCV bars for `symbols` (default: the watchlist), one symbol at a time.
+
+    Bars are fetched at background priority so large exports don't delay
+    interactive requests.
+    """
+    manager = get_manager()
+    period = request.args.get('period', '1y')
+    interval = request.args.get('interval', '1d')
+    symbols = request.args.get('symbols', '')
+    symbols = [s.strip() for s in symbols.split(',') if s.strip()] or watchlist_symbols(manager)
+    
+    def fetch(symbol):
+        return call_provider(fetch_queue.call, f"ohlcv:{symbol}:{period}:{interval}",
+                             manager.get_ohlcv, symbol, period, interval)
+    
+    return export_response('history', history_rows(symbols, fetch), HISTORY_COLUMNS)
 
 
 @app.route("/api/alerts/check")
 def check_alerts_api():
     """API endpoint to manually check alerts"""
-    triggered_alerts = stock_manager.check_alerts()
+    tenant_id = current_tenant()
+    triggered_alerts = call_provider(tenants.get(tenant_id).check_alerts)
     
     # Send real-time notifications for triggered alerts
     for alert in triggered_alerts:
-        socketio.emit('alert_triggered', {
-            'symbol': alert.symbol,
-            'message': alert.message,
-            'threshold': alert.threshold,
-            'alert_type': alert.alert_type.value,
-            'sound_enabled': alert.sound_enabled,
-            'notification_enabled': alert.notification_enabled,
-            'triggered_at': alert.triggered_at
-        })
+        socketio.emit('alert_triggered', alert_event(alert), to=tenant_room(tenant_id))
     
     return jsonify([{
         'id': alert.id,
@@ -188,11 +427,54 @@ def check_alerts_api():
     } for alert in triggered_alerts])
 
 
+@app.route("/api/alerts/backtest")
+def backtest_alert_api():
+    """API endpoint to replay daily history through an alert before creating it"""
+    # Imported here so pandas stays out of app startup
+    from backtest import AlertBacktester, parse_alert
+    
+    try:
+        symbol = request.args.get('symbol', '').strip().upper()
+        alert = parse_alert(f"{symbol}:{request.args.get('alert_type')}:{request.args.get('threshold')}")
+    except ValueError as e:
+        return jsonify({"error": f"Invalid input: {e}"}), 400
+    
+    period = request.args.get('period', '5y')
+    
+    def load(_):
+        try:
+            return AlertBacktester.from_yfinance([alert.symbol], period)
+        except ValueError:
+            return None  # no bars for this symbol/period
+    
+    # Years of bars are shared by every alert on the symbol, so the loaded
+    # frame is cached like chart history and concurrent loads are coalesced
+    try:
+        backtester = call_provider(quote_cache.get_or_fetch, f"backtest:{alert.symbol}:{period}", load,
+                                   FetchPriority.INTERACTIVE, INTERACTIVE_FETCH_TIMEOUT, HISTORY_CACHE_TTL)
+    except FetchTimeoutError:
+        return jsonify({"error": "Data provider timed out"}), 504
+    except Exception as e:
+        print(f"Error loading backtest history for {alert.symbol}: {e}")
+        return jsonify({"error": "Data provider error"}), 502
+    if backtester is None:
+        return jsonify({"error": "History not available"}), 404
+    
+    result = backtester.run([alert])[0]
+    return jsonify(asdict(result))
+
+
 # WebSocket event handlers
 @socketio.on('connect')
 def handle_connect():
     """Handle client connection"""
-    connected_clients.add(request.sid)
+    tenant_id = request.headers.get(TENANT_HEADER) or DEFAULT_TENANT
+    try:
+        TenantRegistry.validate(tenant_id)
+    except ValueError as e:
+        raise ConnectionRefusedError(str(e))
+    connected_clients[request.sid] = tenant_id
+    join_room(tenant_room(tenant_id))
     emit('connected', {'message': 'Connected to stock watchlist'})
     print(f"Client {request.sid} connected")
 
@@ -200,63 +482,133 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
-    connected_clients.discard(request.sid)
+    connected_clients.pop(request.sid, None)
     print(f"Client {request.sid} disconnected")
 
 
 @socketio.on('request_update')
 def handle_update_request():
     """Handle manual update request from client"""
-    stocks = stock_manager.get_all_stocks()
+    stocks = current_stocks(connected_clients.get(request.sid, DEFAULT_TENANT))
     emit('stocks_updated', stocks)
 
 
+@socketio.on('latency_probe')
+def handle_latency_probe(data=None):
+    """Broadcast a timestamped probe so load tests can measure fan-out latency"""
+    if not app.config['LATENCY_PROBE_ENABLED']:
+        return
+    socketio.emit('latency_probe', {
+        'probe_id': (data or {}).get('probe_id'),
+        'sent_at': time.time()
+    })
+
+
 def check_alerts_background():
     """Background task to check alerts periodically"""
     while True:
         try:
-            triggered_alerts = stock_manager.check_alerts()
-            
-            if triggered_alerts and connected_clients:
-                for alert in triggered_alerts:
-                    socketio.emit('alert_triggered', {
-                        'symbol': alert.symbol,
-                        'message': alert.message,
-                        'threshold': alert.threshold,
-                        'alert_type': alert.alert_type.value,
-                        'sound_enabled': alert.sound_enabled,
-                        'notification_enabled': alert.notification_enabled,
-                        'triggered_at': alert.triggered_at
-                    })
+            if is_fetcher():
+                if message_bus.distributed:
+                    # Pick up alerts created or disabled on other workers
+                    tenants.reload_all()
+                
+                # Quotes are shared through quote_cache, so a symbol watched
+                # by many tenants is only fetched once per cycle
+                for tenant_id, manager in tenants.managers():
+                    triggered_alerts = call_provider(manager.check_alerts)
+                    for alert in triggered_alerts:
+                        socketio.emit('alert_triggered', alert_event(alert),
+                                      to=tenant_room(tenant_id))
             
-            time.sleep(30)  # Check every 30 seconds
+            socketio.sleep(30)  # Check every 30 seconds
         except Exception as e:
             print(f"Error in background alert checking: {e}")
-            time.sleep(60)  # Wait longer on error
+            socketio.sleep(60)  # Wait longer on error
 
 
 def update_prices_background():
     """Background task to update stock prices periodically"""
     while True:
         try:
-            if connected_clients:
-                stocks = stock_manager.get_all_stocks()
-                socketio.emit('stocks_updated', stocks)
+            # Clients on other workers only hear from us through the queue,
+            # so when scaled out every tenant is refreshed
+            if message_bus.distributed:
+                managers = tenants.managers()
+            else:
+                managers = [(tenant_id, tenants.get(tenant_id))
+                            for tenant_id in sorted(set(connected_clients.values()))]
             
-            time.sleep(60)  # Update every minute
+            if is_fetcher():
+                if message_bus.distributed:
+                    tenants.reload_all()
+                for tenant_id, manager in managers:
+                    stocks = call_provider(manager.get_all_stocks)
+                    message_bus.publish_snapshot(f'stocks:{tenant_id}', stocks)
+                    response_cache.put(f'watchlist:{tenant_id}', stocks, QUOTE_CACHE_TTL)
+                    socketio.emit('stocks_updated', stocks, to=tenant_room(tenant_id))
+            
+            socketio.sleep(60)  # Update every minute
         except Exception as e:
             print(f"Error in background price update: {e}")
-            time.sleep(120)  # Wait longer on error
+            socketio.sleep(120)  # Wait longer on error
+
+
+def snapshot_background():
+    """Background task to persist in-memory market state for warm restarts"""
+    from snapshot import save_state
+    
+    while True:
+        socketio.sleep(SNAPSHOT_INTERVAL)
+        try:
+            if is_fetcher():
+                call_provider(save_state, SNAPSHOT_PATH, quote_cache, tenants)
+        except Exception as e:
+            print(f"Error writing state snapshot: {e}")
+
+
+def restore_snapshot():
+    """Seed the quote cache from the last snapshot, if there is one"""
+    from snapshot import restore_state
+    
+    try:
+        started = time.perf_counter()
+        restored = restore_state(SNAPSHOT_PATH, quote_cache, SNAPSHOT_CATCHUP_SECONDS)
+        if restored:
+            print(f"Restored {restored} cached quotes from {SNAPSHOT_PATH} "
+                  f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+    except Exception as e:
+        print(f"Ignoring unreadable state snapshot {SNAPSHOT_PATH}: {e}")
+
+
+def release_fetcher_lease():
+    try:
+        message_bus.release_leadership(WORKER_ID)
+    except Exception as e:
+        print(f"Error releasing fetcher lease: {e}")
+
+
+def start_background_tasks():
+    """Start the alert and price loops on the active async worker"""
+    global background_tasks_started
+    if background_tasks_started:
+        return
+    background_tasks_started = True
+
+    # Hand the fetcher lease over right away on a clean shutdown instead of
+    # leaving other workers without quotes until it expires
+    atexit.register(release_fetcher_lease)
+
+    if SNAPSHOT_PATH:
+        restore_snapshot()
+        socketio.start_background_task(snapshot_background)
+    socketio.start_background_task(check_alerts_background)
+    socketio.start_background_task(update_prices_background)
 
 
-# Start background threads
 if __name__ == "__main__":
     # Start background tasks
-    alert_thread = threading.Thread(target=check_alerts_background, daemon=True)
-    price_thread = threading.Thread(target=update_prices_background, daemon=True)
-    
-    alert_thread.start()
-    price_thread.start()
+    start_background_tasks()
     
-    # Run the app
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # Run the development server (use serve.py for production)
+    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Alert backtesting for Enhanced Stock Watchlist Application
+Replays daily OHLCV history through the same conditions check_alerts uses
+(evaluate_alert), vectorized across every symbol and alert at once.
+
+Usage:
+    python backtest.py --alert AAPL:price_above:200 --alert MSFT:rsi_oversold:30 --period 5y
+    python backtest.py --alerts-file data/alerts.csv --history-dir history/
+    python backtest.py --synthetic 1000 --years 10    # speed benchmark
+"""
+
+import argparse
+import glob
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from indicators import compute_rsi
+from stock_manager import (ALERT_METRICS, AlertStatus, AlertType, StockAlert,
+                           StockManager, evaluate_alert)
+
+
+@dataclass
+class BacktestResult:
+    alert_id: str
+    symbol: str
+    alert_type: str
+    threshold: float
+    trigger_count: int
+    trigger_dates: List[str] = field(default_factory=list)
+    first_triggered_at: Optional[str] = None
+
+
+class AlertBacktester:
+    """Evaluates alerts against wide (dates x symbols) close and volume frames.
+
+    A trigger is counted on each bar where the condition becomes true, as if
+    the alert re-armed once the condition cleared.
+    """
+
+    def __init__(self, close: pd.DataFrame, volume: pd.DataFrame, rsi_period: int = 14):
+        self.close = close.sort_index()
+        self.volume = volume.reindex(index=self.close.index, columns=self.close.columns)
+        self.rsi_period = rsi_period
+        self._metrics: Dict[str, np.ndarray] = {}
+        self._columns = {symbol: i for i, symbol in enumerate(self.close.columns)}
+        self.dates = np.datetime_as_string(
+            self.close.index.values.astype('datetime64[D]'), unit='D')
+
+    @classmethod
+    def from_yfinance(cls, symbols: List[str], period: str = "5y", **kwargs) -> "AlertBacktester":
+        """Download daily bars for all symbols in one batched request"""
+        import yfinance as yf
+
+        data = yf.download(sorted(set(symbols)), period=period, interval="1d",
+                           group_by="column", auto_adjust=False, progress=False)
+        if data.empty:
+            raise ValueError("No history returned for the requested symbols")
+        close, volume = data["Close"], data["Volume"]
+        if isinstance(close, pd.Series):
+            close, volume = close.to_frame(symbols[0]), volume.to_frame(symbols[0])
+        return cls(close, volume, **kwargs)
+
+    @classmethod
+    def from_csv_dir(cls, path: str, **kwargs) -> "AlertBacktester":
+        """Load stored history from <SYMBOL>.csv files with Date, Close and Volume columns"""
+        closes, volumes = {}, {}
+        for csv_path in sorted(glob.glob(os.path.join(path, "*.csv"))):
+            symbol = os.path.splitext(os.path.basename(csv_path))[0].upper()
+            bars = pd.read_csv(csv_path, usecols=["Date", "Close", "Volume"],
+                               index_col="Date", parse_dates=True)
+            closes[symbol] = bars["Close"]
+            volumes[symbol] = bars["Volume"]
+        if not closes:
+            raise ValueError(f"No history CSV files found in {path}")
+        return cls(pd.DataFrame(closes), pd.DataFrame(volumes), **kwargs)
+
+    def metric(self, name: str) -> np.ndarray:
+        """A (dates x symbols) matrix of the value alerts are compared against"""
+        if name not in self._metrics:
+            if name == 'price':
+                values = self.close
+            elif name == 'change_percent':
+                values = self.close.pct_change(fill_method=None) * 100
+            elif name == 'volume':
+                values = self.volume
+            else:
+                values = compute_rsi(self.close, self.rsi_period)
+            self._metrics[name] = values.to_numpy(dtype=np.float64)
+        return self._metrics[name]
+
+    def run(self, alerts: List[StockAlert]) -> List[BacktestResult]:
+        """Backtest every alert; alerts on symbols without history get no triggers"""
+        results = [BacktestResult(alert_id=alert.id, symbol=alert.symbol,
+                                  alert_type=alert.alert_type.value,
+                                  threshold=alert.threshold, trigger_count=0)
+                   for alert in alerts]
+
+        for alert_type in AlertType:
+            members = [i for i, alert in enumerate(alerts)
+                       if alert.alert_type == alert_type and alert.symbol in self._columns]
+            if not members:
+                continue
+
+            columns = np.array([self._columns[alerts[i].symbol] for i in members])
+            thresholds = np.array([alerts[i].threshold for i in members], dtype=np.float64)
+            metric_name = ALERT_METRICS[alert_type]
+            values = self.metric(metric_name)[:, columns]
+
+            # One column per alert; thresholds broadcast across the rows
+            active = evaluate_alert(alert_type, thresholds, **{metric_name: values})
+            fired = active.copy()
+            fired[1:] &= ~active[:-1]
+
+            counts = fired.sum(axis=0)
+            _, date_rows = np.nonzero(fired.T)
+            splits = np.split(date_rows, np.cumsum(counts)[:-1])
+            for member, count, rows in zip(members, counts, splits):
+                result = results[member]
+                result.trigger_count = int(count)
+                result.trigger_dates = self.dates[rows].tolist()
+                result.first_triggered_at = result.trigger_dates[0] if count else None
+
+        return results
+
+
+def parse_alert(spec: str) -> StockAlert:
+    """Parse SYMBOL:alert_type:threshold into an alert"""
+    symbol, alert_type, threshold = spec.split(":")
+    return StockAlert(id=f"{symbol.upper()}_{alert_type}_{threshold}", symbol=symbol.upper(),
+                      alert_type=AlertType(alert_type), threshold=float(threshold),
+                      status=AlertStatus.ACTIVE, created_at="")
+
+
+def synthetic_backtester(symbol_count: int, years: int, seed: int = 7) -> AlertBacktester:
+    """Random-walk daily bars, for benchmarking without network access"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=252 * years)
+    symbols = [f"SYM{i:04d}" for i in range(symbol_count)]
+    returns = rng.normal(0.0003, 0.02, size=(len(dates), symbol_count))
+    close = pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), index=dates, columns=symbols)
+    volume = pd.DataFrame(rng.lognormal(14, 0.5, size=close.shape), index=dates, columns=symbols)
+    return AlertBacktester(close, volume)
+
+
+def synthetic_alerts(symbols: List[str]) -> List[StockAlert]:
+    """One alert of every type per symbol"""
+    thresholds = {
+        AlertType.PRICE_ABOVE: 150.0,
+        AlertType.PRICE_BELOW: 60.0,
+        AlertType.PERCENTAGE_CHANGE: 5.0,
+        AlertType.VOLUME_SPIKE: 3_000_000.0,
+        AlertType.RSI_OVERSOLD: 30.0,
+        AlertType.RSI_OVERBOUGHT: 70.0,
+    }
+    return [parse_alert(f"{symbol}:{alert_type.value}:{threshold}")
+            for symbol in symbols for alert_type, threshold in thresholds.items()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest stock alerts against daily history")
+    parser.add_argument('--alert', action='append', default=[],
+                        help="SYMBOL:alert_type:threshold (repeatable)")
+    parser.add_argument('--alerts-file', help="alerts CSV, e.g. data/alerts.csv")
+    parser.add_argument('--history-dir', help="directory of <SYMBOL>.csv daily bars")
+    parser.add_argument('--period', default='5y', help="yfinance period when downloading")
+    parser.add_argument('--synthetic', type=int, metavar='SYMBOLS',
+                        help="benchmark on random-walk data for this many symbols")
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--show-dates', type=int, default=5,
+                        help="trigger dates to print per alert")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.synthetic:
+        backtester = synthetic_backtester(args.synthetic, args.years)
+        alerts = synthetic_alerts(list(backtester.close.columns))
+    else:
+        alerts = [parse_alert(spec) for spec in args.alert]
+        if args.alerts_file:
+            alerts += StockManager(alerts_file=args.alerts_file).alerts
+        if not alerts:
+            parser.error("give at least one --alert, --alerts-file or --synthetic")
+        if args.history_dir:
+            backtester = AlertBacktester.from_csv_dir(args.history_dir)
+        else:
+            backtester = AlertBacktester.from_yfinance([a.symbol for a in alerts], args.period)
+    loaded = time.perf_counter()
+
+    results = backtester.run(alerts)
+    finished = time.perf_counter()
+
+    bars, symbols = backtester.close.shape
+    print(f"Replayed {bars} bars x {symbols} symbols for {len(alerts)} alerts")
+    print(f"  load {loaded - started:.2f}s  evaluate {finished - loaded:.2f}s")
+
+    if args.synthetic:
+        total = sum(result.trigger_count for result in results)
+        print(f"  {total} triggers in total")
+        return
+
+    for result in results:
+        print(f"\n{result.symbol} {result.alert_type} {result.threshold}: "
+              f"{result.trigger_count} triggers")
+        for date in result.trigger_dates[-args.show_dates:]:
+            print(f"  {date}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import struct
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import numpy as np
+
+
+# Binary history layout (little endian), aligned for JS typed arrays:
+#   b"SWH1" | uint32 count | int32[count] days since 1970-01-01
+#   | float32[count] close prices | float64[count] volumes
+BINARY_MAGIC = b"SWH1"
+BINARY_HEADER = struct.Struct("<4sI")
+
+# Upper bound for the `points` query parameter; no chart needs more
+MAX_CHART_POINTS = 5000
+
+
+@dataclass
+class HistoryColumns:
+    dates: np.ndarray    # datetime64[D]
+    prices: np.ndarray   # float64
+    volumes: np.ndarray  # float64
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def to_dict(self) -> Dict:
+        """JSON-friendly parallel lists (the original history API format)"""
+        return {
+            'dates': np.datetime_as_string(self.dates, unit='D').tolist(),
+            'prices': np.round(self.prices, 2).tolist(),
+            'volumes': self.volumes.astype(np.int64).tolist()
+        }
+
+    def to_bytes(self) -> bytes:
+        """Compact columnar payload that the browser can view as typed arrays"""
+        days = self.dates.astype('datetime64[D]').astype('<i4')
+        return b"".join([
+            BINARY_HEADER.pack(BINARY_MAGIC, len(self)),
+            days.tobytes(),
+            np.round(self.prices, 2).astype('<f4').tobytes(),
+            self.volumes.astype('<f8').tobytes()
+        ])
+
+    def downsample(self, max_points: Optional[int]) -> "HistoryColumns":
+        """Reduce to at most `max_points` bars, keeping the visual shape of the price line.
+
+        Points are picked with Largest-Triangle-Three-Buckets; each picked bar
+        carries the total volume of the bucket it represents.
+        """
+        if not max_points or max_points >= len(self):
+            return self
+
+        max_points = max(3, min(max_points, MAX_CHART_POINTS))
+        selected, bucket_starts = lttb_indices(self.prices, max_points)
+        return HistoryColumns(
+            dates=self.dates[selected],
+            prices=self.prices[selected],
+            volumes=np.add.reduceat(self.volumes, bucket_starts)
+        )
+
+
+def lttb_indices(values: np.ndarray, threshold: int):
+    """Largest-Triangle-Three-Buckets selection over evenly spaced samples.
+
+    Returns the selected indices and the start index of the bucket each one
+    was chosen from. The first and last samples are always kept.
+    """
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        indices = np.arange(n)
+        return indices, indices
+
+    x = np.arange(n, dtype=np.float64)
+    y = np.asarray(values, dtype=np.float64)
+
+    # threshold - 2 buckets over the interior points; each is non-empty
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # Twice the triangle area formed with the previous pick and next bucket's mean
+        area = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+
+    bucket_starts = np.concatenate(([0], edges[:-1], [n - 1]))
+    return selected, bucket_starts
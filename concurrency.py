@@ -0,0 +1,44 @@
+import sys
+import threading
+
+
+def patched_by():
+    """Name of the async library that monkey-patched threading, if any"""
+    if 'eventlet' in sys.modules:
+        from eventlet.patcher import is_monkey_patched
+        if is_monkey_patched('thread'):
+            return 'eventlet'
+    if 'gevent' in sys.modules:
+        from gevent import monkey
+        if monkey.is_module_patched('threading'):
+            return 'gevent'
+    return None
+
+
+def native_lock():
+    """A lock that works from the native threads provider calls run on.
+
+    Under eventlet/gevent, threading.Lock is monkey-patched into a green lock
+    that deadlocks when contended from tpool/threadpool threads.
+    """
+    library = patched_by()
+    if library == 'eventlet':
+        from eventlet.patcher import original
+        return original('_thread').allocate_lock()
+    if library == 'gevent':
+        from gevent import monkey
+        return monkey.get_original('_thread', 'allocate_lock')()
+    return threading.Lock()
+
+
+def start_native_thread(target, *args):
+    """Start a real OS thread even when threading is monkey-patched"""
+    library = patched_by()
+    if library == 'eventlet':
+        from eventlet.patcher import original
+        original('_thread').start_new_thread(target, args)
+    elif library == 'gevent':
+        from gevent import monkey
+        monkey.get_original('_thread', 'start_new_thread')(target, args)
+    else:
+        threading.Thread(target=target, args=args, daemon=True).start()
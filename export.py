@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming export for Enhanced Stock Watchlist Application
+Writes watchlist snapshots, alert logs and multi-symbol OHLCV history as
+CSV, NDJSON or Parquet. Rows are produced by generators and written in
+chunks, so memory stays flat however many symbols or bars are exported.
+
+Usage:
+    python export.py watchlist --format csv > watchlist.csv
+    python export.py alerts --tenant alice --format ndjson -o alerts.ndjson
+    python export.py history --symbols AAPL,MSFT --period 10y --format parquet -o history.parquet
+"""
+
+import argparse
+import csv
+import io
+import json
+import math
+import sys
+from dataclasses import asdict
+from typing import Any, Callable, Iterable, Iterator, List, Tuple
+
+from stock_manager import AlertStatus, AlertType, StockData, StockManager, parse_enum
+
+
+# Rows are written this many at a time (one Parquet row group per chunk)
+CHUNK_ROWS = 1000
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# (column, type) in output order; types are 'string', 'double', 'int64' or 'bool'
+Columns = List[Tuple[str, str]]
+
+WATCHLIST_COLUMNS: Columns = [
+    ('symbol', 'string'), ('current_price', 'double'), ('previous_close', 'double'),
+    ('day_change', 'double'), ('day_change_percent', 'double'), ('volume', 'int64'),
+    ('market_cap', 'double'), ('pe_ratio', 'double'), ('dividend_yield', 'double'),
+    ('week_52_high', 'double'), ('week_52_low', 'double'), ('last_updated', 'string'),
+    ('exchange', 'string'), ('company_name', 'string'),
+]
+
+ALERT_COLUMNS: Columns = [
+    ('id', 'string'), ('symbol', 'string'), ('alert_type', 'string'), ('threshold', 'double'),
+    ('status', 'string'), ('created_at', 'string'), ('triggered_at', 'string'),
+    ('sound_enabled', 'bool'), ('notification_enabled', 'bool'), ('message', 'string'),
+]
+
+HISTORY_COLUMNS: Columns = [
+    ('symbol', 'string'), ('date', 'string'), ('open', 'double'), ('high', 'double'),
+    ('low', 'double'), ('close', 'double'), ('volume', 'int64'),
+]
+
+
+def _coerce(value: Any, kind: str) -> Any:
+    """Convert a stored (often string) value to its column type; blanks and NaN become None"""
+    if value is None or value == '':
+        return None
+    if kind == 'string':
+        return str(value)
+    if kind == 'bool':
+        return value if isinstance(value, bool) else str(value).lower() == 'true'
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(number):
+        return None
+    return int(number) if kind == 'int64' else number
+
+
+def _record(row: dict, columns: Columns) -> tuple:
+    return tuple(_coerce(row.get(name), kind) for name, kind in columns)
+
+
+def _read_csv(path: str) -> Iterator[dict]:
+    """Yield rows from a CSV file one at a time"""
+    try:
+        with open(path, mode="r", newline="") as file:
+            yield from csv.DictReader(file)
+    except FileNotFoundError:
+        return
+
+
+def watchlist_symbols(manager: StockManager) -> Iterator[str]:
+    for row in _read_csv(manager.csv_file):
+        yield row['symbol']
+
+
+def watchlist_rows(manager: StockManager, quote_cache=None) -> Iterator[tuple]:
+    """Stored watchlist rows, overlaid with already-cached quotes (never fetches)"""
+    for row in _read_csv(manager.csv_file):
+        quote = quote_cache.peek(row['symbol']) if quote_cache is not None else None
+        if isinstance(quote, StockData):
+            row = asdict(quote)
+        yield _record(row, WATCHLIST_COLUMNS)
+
+
+def alert_rows(manager: StockManager) -> Iterator[tuple]:
+    """Every stored alert with its status and trigger time"""
+    for row in _read_csv(manager.alerts_file):
+        # Files written before enum values were stored hold e.g. 'AlertType.PRICE_ABOVE'
+        row['alert_type'] = parse_enum(AlertType, row['alert_type']).value
+        row['status'] = parse_enum(AlertStatus, row['status']).value
+        yield _record(row, ALERT_COLUMNS)
+
+
+def history_rows(symbols: Iterable[str], fetch: Callable[[str], Any]) -> Iterator[tuple]:
+    """OHLCV rows for each symbol in turn; only one symbol's bars are held at a time.
+
+    `fetch(symbol)` returns a DataFrame like StockManager.get_ohlcv, or None.
+    """
+    for symbol in symbols:
+        bars = fetch(symbol.upper())
+        if bars is None:
+            continue
+        for timestamp, bar in zip(bars.index, bars.itertuples(index=False)):
+            yield (symbol.upper(), timestamp.isoformat(),
+                   _coerce(bar.Open, 'double'), _coerce(bar.High, 'double'),
+                   _coerce(bar.Low, 'double'), _coerce(bar.Close, 'double'),
+                   _coerce(bar.Volume, 'int64'))
+        # Free this symbol's bars before fetching the next
+        del bars
+
+
+def _batches(rows: Iterable[tuple], size: int) -> Iterator[List[tuple]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def csv_chunks(rows: Iterable[tuple], columns: Columns, chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in columns])
+    for batch in _batches(rows, chunk_rows):
+        writer.writerows(['' if value is None else value for value in row] for row in batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header only: nothing was exported
+        yield buffer.getvalue().encode('utf-8')
+
+
+def ndjson_chunks(rows: Iterable[tuple], columns: Columns, chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    names = [name for name, _ in columns]
+    for batch in _batches(rows, chunk_rows):
+        yield "".join(json.dumps(dict(zip(names, row))) + "\n" for row in batch).encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def parquet_chunks(rows: Iterable[tuple], columns: Columns, chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {'string': pa.string(), 'double': pa.float64(), 'int64': pa.int64(), 'bool': pa.bool_()}
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in _batches(rows, chunk_rows):
+            arrays = [pa.array(values, type=field.type)
+                      for values, field in zip(zip(*batch), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_chunks(rows: Iterable[tuple], columns: Columns, fmt: str = 'csv',
+                  chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    """Encode rows as a stream of byte chunks.
+
+    Raises ValueError for an unknown format and RuntimeError when Parquet is
+    requested without pyarrow, before any rows are consumed.
+    """
+    if fmt == 'csv':
+        return csv_chunks(rows, columns, chunk_rows)
+    if fmt == 'ndjson':
+        return ndjson_chunks(rows, columns, chunk_rows)
+    if fmt == 'parquet':
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise RuntimeError("Parquet export requires the pyarrow package (pip install pyarrow)")
+        return parquet_chunks(rows, columns, chunk_rows)
+    raise ValueError(f"Unknown export format {fmt!r}; use one of {', '.join(EXPORT_FORMATS)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export watchlist, alerts or OHLCV history")
+    parser.add_argument('dataset', choices=['watchlist', 'alerts', 'history'])
+    parser.add_argument('--format', default='csv', choices=list(EXPORT_FORMATS))
+    parser.add_argument('-o', '--output', default='-', help="output file (default: stdout)")
+    parser.add_argument('--tenant', default='default', help="user whose data to export")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--symbols', help="comma-separated symbols for history "
+                                          "(default: the tenant's watchlist)")
+    parser.add_argument('--period', default='1y', help="yfinance period for history")
+    parser.add_argument('--interval', default='1d', help="yfinance bar interval for history")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    from tenants import TenantRegistry
+    manager = TenantRegistry(data_dir=args.data_dir).get(args.tenant)
+
+    if args.dataset == 'watchlist':
+        rows, columns = watchlist_rows(manager), WATCHLIST_COLUMNS
+    elif args.dataset == 'alerts':
+        rows, columns = alert_rows(manager), ALERT_COLUMNS
+    else:
+        symbols = args.symbols.split(',') if args.symbols else watchlist_symbols(manager)
+        rows = history_rows((s.strip() for s in symbols if s.strip()),
+                            lambda symbol: manager.get_ohlcv(symbol, args.period, args.interval))
+        columns = HISTORY_COLUMNS
+
+    try:
+        chunks = export_chunks(rows, columns, args.format, args.chunk_rows)
+    except RuntimeError as e:
+        parser.error(str(e))
+
+    output = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import heapq
+import itertools
+import time
+from enum import IntEnum
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from concurrency import native_lock, start_native_thread
+
+
+class FetchPriority(IntEnum):
+    # Lower values are served first
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class FetchTimeoutError(Exception):
+    """Raised when a fetch does not finish before the caller's deadline"""
+
+
+class FetchFuture:
+    """Result of a queued fetch, shared by every caller coalesced onto it"""
+
+    def __init__(self, key: str, deadline: Optional[float]):
+        self.key = key
+        # Monotonic time after which nobody is waiting for the result any more
+        self.deadline = deadline
+        self._done = native_lock()
+        self._done.acquire()
+        self._result = None
+        self._error: Optional[BaseException] = None
+
+    def done(self) -> bool:
+        return not self._done.locked()
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def extend_deadline(self, deadline: Optional[float]):
+        """Keep the fetch alive for the most patient caller"""
+        if self.deadline is not None and (deadline is None or deadline > self.deadline):
+            self.deadline = deadline
+
+    def set_result(self, result: Any):
+        self._result = result
+        self._done.release()
+
+    def set_exception(self, error: BaseException):
+        self._error = error
+        self._done.release()
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        """Wait for the result; raises FetchTimeoutError after `timeout` seconds"""
+        if not self._done.acquire(timeout=-1 if timeout is None else max(0.0, timeout)):
+            raise FetchTimeoutError(f"Timed out waiting for {self.key}")
+        self._done.release()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class FetchQueue:
+    """Prioritized upstream fetches with in-flight coalescing.
+
+    Interactive fetches are always taken ahead of queued background work, and
+    `reserved_interactive` workers never pick up background jobs, so a large
+    background refresh cannot starve user requests. Submitting a key that is
+    already queued or running returns the existing future instead of going
+    upstream again. Workers are native threads, so results must be waited on
+    from native threads too (see app.call_provider).
+    """
+
+    def __init__(self, workers: int = 4, reserved_interactive: int = 1):
+        self.workers = max(1, workers)
+        self.reserved_interactive = min(reserved_interactive, self.workers - 1)
+        self._lock = native_lock()
+        # (lowest priority it runs, wakeup lock) for each worker waiting for work
+        self._idle: List[Tuple[FetchPriority, Any]] = []
+        self._heap: List[Tuple[int, int, str]] = []
+        self._pending: Dict[str, Tuple[Callable, tuple, FetchPriority]] = {}
+        self._in_flight: Dict[str, FetchFuture] = {}
+        self._sequence = itertools.count()
+        self._started = False
+
+    def submit(self, key: str, fn: Callable, *args,
+               priority: FetchPriority = FetchPriority.BACKGROUND,
+               timeout: Optional[float] = None) -> FetchFuture:
+        """Queue `fn(*args)` under `key`, or join the identical fetch already in flight"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                future.extend_deadline(deadline)
+                pending = self._pending.get(key)
+                if pending is not None and priority < pending[2]:
+                    # Promote queued work; the old heap entry is skipped as stale
+                    self._pending[key] = (pending[0], pending[1], priority)
+                    heapq.heappush(self._heap, (priority, next(self._sequence), key))
+                    self._signal(priority)
+                return future
+
+            future = FetchFuture(key, deadline)
+            self._in_flight[key] = future
+            self._pending[key] = (fn, args, priority)
+            heapq.heappush(self._heap, (priority, next(self._sequence), key))
+            self._start_workers()
+            self._signal(priority)
+        return future
+
+    def call(self, key: str, fn: Callable, *args,
+             priority: FetchPriority = FetchPriority.BACKGROUND,
+             timeout: Optional[float] = None) -> Any:
+        """Submit and wait for the result"""
+        return self.submit(key, fn, *args, priority=priority, timeout=timeout).result(timeout)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _signal(self, priority: FetchPriority):
+        """Wake one idle worker allowed to run `priority` jobs; call with _lock held"""
+        for i, (lowest_priority, wakeup) in enumerate(self._idle):
+            if priority <= lowest_priority:
+                del self._idle[i]
+                wakeup.release()
+                return
+
+    def _start_workers(self):
+        if self._started:
+            return
+        self._started = True
+        for i in range(self.workers):
+            lowest = FetchPriority.INTERACTIVE if i < self.reserved_interactive else FetchPriority.BACKGROUND
+            start_native_thread(self._worker, lowest)
+
+    def _next_job(self, lowest_priority: FetchPriority, wakeup):
+        """Pop the most urgent live job this worker may run, or mark it idle and return None"""
+        with self._lock:
+            while self._heap:
+                priority, _, key = self._heap[0]
+                if priority > lowest_priority:
+                    break
+                heapq.heappop(self._heap)
+                pending = self._pending.get(key)
+                if pending is None or pending[2] != priority:
+                    continue
+
+                del self._pending[key]
+                future = self._in_flight[key]
+                if future.expired():
+                    # Every caller has given up; don't spend quota on it
+                    del self._in_flight[key]
+                    future.set_exception(FetchTimeoutError(f"Deadline passed before {key} started"))
+                    continue
+
+                if self._heap:
+                    self._signal(self._heap[0][0])
+                return key, pending[0], pending[1], future
+
+            self._idle.append((lowest_priority, wakeup))
+        return None
+
+    def _worker(self, lowest_priority: FetchPriority):
+        wakeup = native_lock()
+        wakeup.acquire()
+        while True:
+            job = self._next_job(lowest_priority, wakeup)
+            if job is None:
+                # Released by _signal once there is work this worker may run
+                wakeup.acquire()
+                continue
+
+            key, fn, args, future = job
+            try:
+                result = fn(*args)
+                error = None
+            except Exception as e:
+                result, error = None, e
+
+            with self._lock:
+                self._in_flight.pop(key, None)
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
@@ -0,0 +1,17 @@
+def compute_rsi(close, period: int = 14):
+    """Wilder's Relative Strength Index of a closes Series or DataFrame.
+
+    DataFrames are computed column-wise in one pass, so many symbols can be
+    processed at once. The first `period` bars are NaN.
+    """
+    delta = close.diff()
+    gain = delta.clip(lower=0)
+    loss = -delta.clip(upper=0)
+
+    # Wilder smoothing is an exponential average with alpha = 1 / period
+    avg_gain = gain.ewm(alpha=1 / period, min_periods=period, adjust=False).mean()
+    avg_loss = loss.ewm(alpha=1 / period, min_periods=period, adjust=False).mean()
+
+    rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    # No losses in the window means RSI is pinned at 100
+    return rsi.where(avg_loss != 0, 100.0).where(avg_gain.notna())
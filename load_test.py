@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Load test for Enhanced Stock Watchlist Application
+Opens N simulated Socket.IO clients against a running server and reports
+connection capacity and broadcast fan-out latency.
+
+The server must be started with ENABLE_LATENCY_PROBE=True so it answers
+'latency_probe' events with a timestamped broadcast, e.g.:
+
+    ENABLE_LATENCY_PROBE=True python serve.py
+    python load_test.py --clients 1000
+    python load_test.py --clients 10000 --connect-concurrency 500
+
+Requires the asyncio Socket.IO client: pip install "python-socketio[asyncio_client]"
+"""
+
+import argparse
+import asyncio
+import resource
+import statistics
+import time
+
+import socketio
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def format_ms(values):
+    """Format latency samples (in seconds) as a one-line summary"""
+    if not values:
+        return "no samples"
+    ms = [v * 1000 for v in values]
+    return (f"min {min(ms):.1f}ms  p50 {percentile(ms, 50):.1f}ms  "
+            f"p95 {percentile(ms, 95):.1f}ms  p99 {percentile(ms, 99):.1f}ms  "
+            f"max {max(ms):.1f}ms  mean {statistics.mean(ms):.1f}ms")
+
+
+class SimulatedClient:
+    """A single dashboard connection that records probe arrival times"""
+
+    def __init__(self, url):
+        self.url = url
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.connect_time = None
+        self.latencies = {}
+        self.sio.on('latency_probe', self.on_probe)
+
+    async def on_probe(self, data):
+        self.latencies[data.get('probe_id')] = time.time() - data['sent_at']
+
+    async def connect(self, timeout):
+        started = time.perf_counter()
+        await self.sio.connect(self.url, transports=['websocket'], wait_timeout=timeout)
+        self.connect_time = time.perf_counter() - started
+
+    async def disconnect(self):
+        if self.sio.connected:
+            await self.sio.disconnect()
+
+
+async def connect_clients(url, count, concurrency, timeout):
+    """Connect `count` clients with at most `concurrency` handshakes in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    clients = [SimulatedClient(url) for _ in range(count)]
+    failures = []
+
+    async def connect_one(client):
+        async with semaphore:
+            try:
+                await client.connect(timeout)
+            except Exception as e:
+                failures.append(str(e))
+
+    await asyncio.gather(*(connect_one(client) for client in clients))
+    connected = [client for client in clients if client.sio.connected]
+    return connected, failures
+
+
+async def run_probes(url, clients, probes, settle):
+    """Trigger broadcast probes and collect per-client delivery latency"""
+    controller = socketio.AsyncClient(reconnection=False)
+    await controller.connect(url, transports=['websocket'])
+
+    latencies = []
+    missing = 0
+    for probe_id in range(probes):
+        await controller.emit('latency_probe', {'probe_id': probe_id})
+        await asyncio.sleep(settle)
+        for client in clients:
+            latency = client.latencies.get(probe_id)
+            if latency is None:
+                missing += 1
+            else:
+                latencies.append(latency)
+
+    await controller.disconnect()
+    return latencies, missing
+
+
+async def main_async(args):
+    print(f"Connecting {args.clients} clients to {args.url} "
+          f"({args.connect_concurrency} concurrent handshakes)...")
+    started = time.perf_counter()
+    clients, failures = await connect_clients(
+        args.url, args.clients, args.connect_concurrency, args.timeout)
+    elapsed = time.perf_counter() - started
+
+    print("\nConnection capacity")
+    print(f"  connected: {len(clients)}/{args.clients} in {elapsed:.1f}s "
+          f"({len(clients) / elapsed if elapsed else 0:.0f} conn/s)")
+    print(f"  failed:    {len(failures)}")
+    if failures:
+        print(f"  first error: {failures[0]}")
+    print(f"  handshake: {format_ms([c.connect_time for c in clients])}")
+
+    if clients and args.probes:
+        latencies, missing = await run_probes(args.url, clients, args.probes, args.settle)
+        print(f"\nBroadcast latency ({args.probes} probes x {len(clients)} clients)")
+        print(f"  delivered: {len(latencies)}  missing: {missing}")
+        print(f"  latency:   {format_ms(latencies)}")
+
+    await asyncio.gather(*(client.disconnect() for client in clients),
+                         return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Socket.IO load test for the stock watchlist")
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--connect-concurrency', type=int, default=200)
+    parser.add_argument('--probes', type=int, default=5)
+    parser.add_argument('--settle', type=float, default=2.0,
+                        help="seconds to wait for each probe to reach every client")
+    parser.add_argument('--timeout', type=float, default=30.0)
+    args = parser.parse_args()
+
+    # Each simulated client holds a socket, so lift the local fd limit too
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
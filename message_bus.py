@@ -0,0 +1,115 @@
+import json
+import os
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+# Renew the lease only if this worker still holds it
+RENEW_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Delete the lease only if this worker still holds it
+RELEASE_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def default_worker_id() -> str:
+    """Identify this worker process across hosts"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LocalMessageBus:
+    """In-process stand-in for the shared bus.
+
+    A single process is always its own fetcher. Several StockManager/app
+    instances can share one LocalMessageBus in tests to simulate workers.
+    """
+
+    def __init__(self, distributed: bool = False):
+        # When distributed, web workers read snapshots instead of polling providers
+        self.distributed = distributed
+        self._lock = threading.Lock()
+        self._leader: Optional[Tuple[str, float]] = None
+        self._snapshots: Dict[str, Any] = {}
+
+    def acquire_leadership(self, worker_id: str, ttl: float = 90) -> bool:
+        """Take or renew the fetcher lease; returns True if worker_id holds it"""
+        now = time.monotonic()
+        with self._lock:
+            if self._leader is None or self._leader[0] == worker_id or self._leader[1] <= now:
+                self._leader = (worker_id, now + ttl)
+                return True
+            return False
+
+    def release_leadership(self, worker_id: str):
+        """Give up the fetcher lease so another worker can take over"""
+        with self._lock:
+            if self._leader and self._leader[0] == worker_id:
+                self._leader = None
+
+    def publish_snapshot(self, name: str, payload: Any):
+        """Store the latest payload for web workers to serve"""
+        with self._lock:
+            self._snapshots[name] = json.loads(json.dumps(payload))
+
+    def get_snapshot(self, name: str) -> Optional[Any]:
+        """Get the latest published payload, if any"""
+        with self._lock:
+            return self._snapshots.get(name)
+
+
+class RedisMessageBus:
+    """Shared bus backed by the same Redis used as the Socket.IO message queue"""
+
+    def __init__(self, url: str, prefix: str = "stock_watchlist"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("Multi-worker mode requires the redis package (pip install redis)")
+
+        self.distributed = True
+        self.prefix = prefix
+        self.redis = redis.Redis.from_url(url)
+        self._renew_lease = self.redis.register_script(RENEW_LEASE_SCRIPT)
+        self._release_lease = self.redis.register_script(RELEASE_LEASE_SCRIPT)
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix,) + parts)
+
+    def acquire_leadership(self, worker_id: str, ttl: float = 90) -> bool:
+        """Take or renew the fetcher lease; returns True if worker_id holds it"""
+        key = self._key("leader")
+        ttl_ms = int(ttl * 1000)
+        if self.redis.set(key, worker_id, nx=True, px=ttl_ms):
+            return True
+        return bool(self._renew_lease(keys=[key], args=[worker_id, ttl_ms]))
+
+    def release_leadership(self, worker_id: str):
+        """Give up the fetcher lease so another worker can take over"""
+        self._release_lease(keys=[self._key("leader")], args=[worker_id])
+
+    def publish_snapshot(self, name: str, payload: Any):
+        """Store the latest payload for web workers to serve"""
+        self.redis.set(self._key("snapshot", name), json.dumps(payload))
+
+    def get_snapshot(self, name: str) -> Optional[Any]:
+        """Get the latest published payload, if any"""
+        raw = self.redis.get(self._key("snapshot", name))
+        return json.loads(raw) if raw is not None else None
+
+
+def create_message_bus(url: Optional[str] = None):
+    """Create the bus for a SOCKETIO_MESSAGE_QUEUE url (local when unset)"""
+    if url and url.startswith(("redis://", "rediss://")):
+        return RedisMessageBus(url)
+    return LocalMessageBus()
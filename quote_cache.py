@@ -0,0 +1,86 @@
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from concurrency import native_lock
+from fetch_queue import FetchPriority, FetchQueue
+
+
+class QuoteCache:
+    """Recent quotes shared by every StockManager in the process.
+
+    Each symbol is fetched at most once per `ttl`, no matter how many
+    watchlists or alerts reference it; concurrent misses for the same symbol
+    wait for a single upstream call. With a `fetch_queue`, misses are
+    scheduled there by priority instead of running on the caller's thread.
+    """
+
+    def __init__(self, ttl: float = 30, fetch_queue: Optional[FetchQueue] = None):
+        self.ttl = ttl
+        self.fetch_queue = fetch_queue
+        # symbol -> (monotonic expiry, quote, wall-clock fetch time)
+        self._quotes: Dict[str, Tuple[float, Any, float]] = {}
+        self._symbol_locks: Dict[str, Any] = {}
+        self._lock = native_lock()
+
+    def _fresh(self, symbol: str) -> Optional[Any]:
+        cached = self._quotes.get(symbol)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        return None
+
+    def _lock_for(self, symbol: str):
+        with self._lock:
+            if symbol not in self._symbol_locks:
+                self._symbol_locks[symbol] = native_lock()
+            return self._symbol_locks[symbol]
+
+    def get_or_fetch(self, symbol: str, fetch: Callable[[str], Optional[Any]],
+                     priority: FetchPriority = FetchPriority.BACKGROUND,
+                     timeout: Optional[float] = None, ttl: Optional[float] = None) -> Optional[Any]:
+        """Get a fresh quote for `symbol`, calling `fetch` only on a miss.
+
+        `ttl` overrides the cache TTL for slow-moving values such as daily indicators.
+        Raises FetchTimeoutError if a queued fetch misses the `timeout` deadline.
+        """
+        symbol = symbol.upper()
+        quote = self._fresh(symbol)
+        if quote is not None:
+            return quote
+
+        if self.fetch_queue is not None:
+            return self.fetch_queue.call(f"quote:{symbol}", self._fetch_and_store, symbol, fetch, ttl,
+                                         priority=priority, timeout=timeout)
+
+        with self._lock_for(symbol):
+            return self._fetch_and_store(symbol, fetch, ttl)
+
+    def _fetch_and_store(self, symbol: str, fetch: Callable[[str], Optional[Any]],
+                         ttl: Optional[float] = None) -> Optional[Any]:
+        # Another caller may have fetched it while we were waiting
+        quote = self._fresh(symbol)
+        if quote is not None:
+            return quote
+
+        quote = fetch(symbol)
+        if quote is not None:
+            expires_in = self.ttl if ttl is None else ttl
+            self._quotes[symbol] = (time.monotonic() + expires_in, quote, time.time())
+        return quote
+
+    def peek(self, symbol: str) -> Optional[Any]:
+        """The last cached quote for `symbol`, even if stale, without fetching"""
+        cached = self._quotes.get(symbol.upper())
+        return cached[1] if cached is not None else None
+
+    def items(self) -> List[Tuple[str, Any, float]]:
+        """All cached (symbol, quote, fetched_at) entries, fresh or not"""
+        return [(symbol, quote, fetched_at)
+                for symbol, (_, quote, fetched_at) in list(self._quotes.items())]
+
+    def prime(self, symbol: str, quote: Any, fetched_at: float, expires_in: float):
+        """Seed a quote (e.g. restored from a snapshot) that stays fresh for `expires_in` seconds"""
+        self._quotes[symbol.upper()] = (time.monotonic() + expires_in, quote, fetched_at)
+
+    def invalidate(self, symbol: str):
+        """Forget a cached quote so the next lookup goes upstream"""
+        self._quotes.pop(symbol.upper(), None)
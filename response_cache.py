@@ -0,0 +1,121 @@
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from flask import Request, Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Payloads smaller than this are cheaper to send as-is than to compress
+MIN_COMPRESS_SIZE = 1024
+
+
+@dataclass
+class CachedPayload:
+    body: bytes
+    etag: str
+    expires_at: float
+    mimetype: str = "application/json"
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+
+    def max_age(self) -> int:
+        """Seconds left before the underlying data is refreshed"""
+        return max(0, int(self.expires_at - time.monotonic()))
+
+    def encode(self, encoding: str) -> bytes:
+        """Get the body compressed with `encoding`, compressing at most once"""
+        if encoding not in self.encoded:
+            if encoding == "br":
+                self.encoded[encoding] = brotli.compress(self.body, quality=5)
+            else:
+                self.encoded[encoding] = gzip.compress(self.body, compresslevel=6)
+        return self.encoded[encoding]
+
+
+class ResponseCache:
+    """Pre-serialized API responses keyed by route, versioned by content hash.
+
+    The ETag is a hash of the serialized payload, so it only changes when the
+    data does and is identical across worker processes.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedPayload]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedPayload]:
+        """Get a cached payload that has not expired yet"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, payload: Any, ttl: float) -> CachedPayload:
+        """Serialize and cache a payload for `ttl` seconds"""
+        body = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        return self.put_bytes(key, body, ttl)
+
+    def put_bytes(self, key: str, body: bytes, ttl: float,
+                  mimetype: str = "application/json") -> CachedPayload:
+        """Cache an already serialized body for `ttl` seconds"""
+        etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+        expires_at = time.monotonic() + ttl
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.etag == etag:
+                # Same snapshot as before: keep the compressed bodies we already built
+                entry.expires_at = expires_at
+            else:
+                entry = CachedPayload(body=body, etag=etag, expires_at=expires_at,
+                                      mimetype=mimetype)
+                self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+
+    def invalidate(self, key: str):
+        """Drop a cached payload so the next request rebuilds it"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def respond(self, entry: CachedPayload, request: Request) -> Response:
+        """Build a 200 or 304 response for `entry`, compressed if the client allows"""
+        if request.if_none_match.contains_weak(entry.etag):
+            response = Response(status=304)
+        else:
+            encoding = self._choose_encoding(request, len(entry.body))
+            if encoding:
+                response = Response(entry.encode(encoding), mimetype=entry.mimetype)
+                response.headers["Content-Encoding"] = encoding
+            else:
+                response = Response(entry.body, mimetype=entry.mimetype)
+
+        response.set_etag(entry.etag, weak=True)
+        response.headers["Cache-Control"] = f"private, max-age={entry.max_age()}"
+        response.vary.add("Accept-Encoding")
+        return response
+
+    @staticmethod
+    def _choose_encoding(request: Request, size: int) -> Optional[str]:
+        if size < MIN_COMPRESS_SIZE:
+            return None
+        accepted = request.accept_encodings
+        if brotli is not None and accepted["br"]:
+            return "br"
+        if accepted["gzip"]:
+            return "gzip"
+        return None
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Production server for Enhanced Stock Watchlist Application
+Runs Flask-SocketIO on a cooperative async worker (eventlet or gevent) so a
+single process can hold thousands of concurrent websocket clients.
+
+Usage:
+    SOCKETIO_ASYNC_MODE=eventlet python serve.py
+"""
+
+import os
+import signal
+import sys
+
+ASYNC_MODE = os.getenv('SOCKETIO_ASYNC_MODE', 'eventlet')
+os.environ['SOCKETIO_ASYNC_MODE'] = ASYNC_MODE
+
+# Monkey patching has to happen before anything else imports socket/threading
+if ASYNC_MODE == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+elif ASYNC_MODE == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+from app import app, socketio, start_background_tasks  # noqa: E402
+
+
+def raise_open_file_limit():
+    """Raise the soft file descriptor limit so every client gets a socket"""
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+    except (ImportError, ValueError, OSError) as e:
+        print(f"Could not raise open file limit: {e}")
+        return None
+
+
+def main():
+    """Start the production server"""
+    host = os.getenv('HOST', '0.0.0.0')
+    port = int(os.getenv('PORT', 5000))
+    max_connections = int(os.getenv('MAX_CONNECTIONS', 20000))
+
+    fd_limit = raise_open_file_limit()
+    if fd_limit is not None and fd_limit < max_connections:
+        print(f"Warning: open file limit {fd_limit} is below MAX_CONNECTIONS={max_connections}")
+
+    server_options = {}
+    if socketio.async_mode == 'eventlet':
+        # eventlet.wsgi caps concurrent connections at 1024 by default
+        server_options['max_size'] = max_connections
+    elif socketio.async_mode == 'gevent':
+        server_options['spawn'] = max_connections
+
+    start_background_tasks()
+    # Exit normally on SIGTERM so atexit hooks (fetcher lease release) run
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    print(f"Serving on {host}:{port} with async mode '{socketio.async_mode}'")
+    socketio.run(app, host=host, port=port, log_output=False, **server_options)
+
+
+if __name__ == "__main__":
+    main()
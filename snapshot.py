@@ -0,0 +1,217 @@
+import json
+import math
+import os
+import struct
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from quote_cache import QuoteCache
+from stock_manager import AlertStatus, AlertType, StockData
+
+
+# File layout: MAGIC | uint64 header length | JSON header | padding to 64 bytes,
+# then the quote, indicator and alert tables as fixed-width records at the
+# offsets listed in the header, so each can be opened with np.memmap.
+SNAPSHOT_MAGIC = b"SWSNAP01"
+SNAPSHOT_VERSION = 1
+PREAMBLE = struct.Struct("<8sQ")
+ALIGNMENT = 64
+
+QUOTE_DTYPE = np.dtype([
+    ('symbol', 'S16'),
+    ('current_price', '<f8'),
+    ('previous_close', '<f8'),
+    ('day_change', '<f8'),
+    ('day_change_percent', '<f8'),
+    ('volume', '<i8'),
+    ('market_cap', '<f8'),
+    ('pe_ratio', '<f8'),
+    ('dividend_yield', '<f8'),
+    ('week_52_high', '<f8'),
+    ('week_52_low', '<f8'),
+    ('fetched_at', '<f8'),
+    ('last_updated', 'S19'),
+    ('exchange', 'S16'),
+    ('company_name', 'S128'),
+])
+
+# Derived values cached next to quotes, e.g. "AAPL:RSI14"
+INDICATOR_DTYPE = np.dtype([
+    ('key', 'S32'),
+    ('value', '<f8'),
+    ('fetched_at', '<f8'),
+])
+
+# Active alerts, so the symbols they watch can be refreshed first after a restart
+ALERT_TYPES = list(AlertType)
+ALERT_DTYPE = np.dtype([
+    ('tenant', 'S64'),
+    ('symbol', 'S16'),
+    ('alert_type', 'u1'),
+    ('threshold', '<f8'),
+])
+
+TABLE_DTYPES = {'quotes': QUOTE_DTYPE, 'indicators': INDICATOR_DTYPE, 'alerts': ALERT_DTYPE}
+
+
+def _float(value) -> float:
+    return float('nan') if value is None else float(value)
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if math.isnan(value) else float(value)
+
+
+def _text(value: bytes) -> str:
+    return value.decode('utf-8', errors='ignore')
+
+
+def build_tables(quote_cache: QuoteCache, tenants=None) -> Dict[str, np.ndarray]:
+    """Copy the in-memory market state into fixed-width record arrays"""
+    quotes, indicators = [], []
+    for key, value, fetched_at in quote_cache.items():
+        if isinstance(value, StockData):
+            quotes.append((
+                value.symbol.encode()[:16], value.current_price, value.previous_close,
+                value.day_change, value.day_change_percent, int(value.volume),
+                _float(value.market_cap), _float(value.pe_ratio), _float(value.dividend_yield),
+                _float(value.week_52_high), _float(value.week_52_low), fetched_at,
+                value.last_updated.encode()[:19], (value.exchange or '').encode()[:16],
+                (value.company_name or '').encode('utf-8')[:128]
+            ))
+        elif isinstance(value, (int, float)):
+            indicators.append((key.encode()[:32], float(value), fetched_at))
+
+    alerts = []
+    if tenants is not None:
+        for tenant_id, manager in tenants.managers():
+            for alert in manager.alerts:
+                if alert.status == AlertStatus.ACTIVE:
+                    alerts.append((tenant_id.encode()[:64], alert.symbol.encode()[:16],
+                                   ALERT_TYPES.index(alert.alert_type), alert.threshold))
+
+    return {
+        'quotes': np.array(quotes, dtype=QUOTE_DTYPE),
+        'indicators': np.array(indicators, dtype=INDICATOR_DTYPE),
+        'alerts': np.array(alerts, dtype=ALERT_DTYPE),
+    }
+
+
+def write_snapshot(path: str, tables: Dict[str, np.ndarray]):
+    """Write tables to `path` atomically (temp file, fsync, rename)"""
+    header = {'version': SNAPSHOT_VERSION, 'created_at': time.time(), 'tables': {}}
+    # The header length depends on the offsets, so reserve room for them up front
+    offset = ALIGNMENT * math.ceil((PREAMBLE.size + 1024) / ALIGNMENT)
+    for name, table in tables.items():
+        header['tables'][name] = {'offset': offset, 'count': len(table)}
+        offset += ALIGNMENT * math.ceil(table.nbytes / ALIGNMENT)
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    first_offset = header['tables'][next(iter(tables))]['offset'] if tables else 0
+    if PREAMBLE.size + len(header_bytes) > first_offset:
+        raise ValueError("Snapshot header too large")
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(tmp_path, "wb") as file:
+            file.write(PREAMBLE.pack(SNAPSHOT_MAGIC, len(header_bytes)))
+            file.write(header_bytes)
+            for name, table in tables.items():
+                file.seek(header['tables'][name]['offset'])
+                file.write(table.tobytes())
+            file.truncate(offset)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    # Make the rename itself durable
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def open_snapshot(path: str):
+    """Memory-map a snapshot; returns (header, {table name: read-only record array})"""
+    with open(path, "rb") as file:
+        magic, header_length = PREAMBLE.unpack(file.read(PREAMBLE.size))
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a stock watchlist snapshot")
+        header = json.loads(file.read(header_length))
+    if header.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {header.get('version')}")
+
+    tables = {}
+    for name, dtype in TABLE_DTYPES.items():
+        info = header['tables'].get(name, {'count': 0})
+        if info['count']:
+            tables[name] = np.memmap(path, dtype=dtype, mode='r',
+                                     offset=info['offset'], shape=(info['count'],))
+        else:
+            tables[name] = np.empty(0, dtype=dtype)
+    return header, tables
+
+
+def save_state(path: str, quote_cache: QuoteCache, tenants=None):
+    """Snapshot the quote cache and active alert index to `path`"""
+    write_snapshot(path, build_tables(quote_cache, tenants))
+
+
+def restore_state(path: str, quote_cache: QuoteCache, catch_up_seconds: float = 120,
+                  max_age: float = 12 * 3600) -> int:
+    """Seed `quote_cache` from a snapshot for a warm restart.
+
+    Restored quotes are served immediately, but their expiry is spread over
+    `catch_up_seconds` (symbols with active alerts first), so providers are
+    re-polled gradually rather than all at once. Entries older than
+    `max_age` are skipped. Returns the number of entries restored.
+    """
+    if not os.path.exists(path):
+        return 0
+    _, tables = open_snapshot(path)
+
+    now = time.time()
+    quotes = tables['quotes']
+    indicators = tables['indicators']
+    quotes = quotes[now - quotes['fetched_at'] <= max_age]
+    indicators = indicators[now - indicators['fetched_at'] <= max_age]
+
+    watched = np.isin(quotes['symbol'], tables['alerts']['symbol'])
+    order = np.argsort(~watched, kind='stable')
+    total = max(len(order), 1)
+
+    for position, i in enumerate(order):
+        row = quotes[i]
+        quote = StockData(
+            symbol=_text(row['symbol']),
+            current_price=float(row['current_price']),
+            previous_close=float(row['previous_close']),
+            day_change=float(row['day_change']),
+            day_change_percent=float(row['day_change_percent']),
+            volume=int(row['volume']),
+            market_cap=_optional(row['market_cap']),
+            pe_ratio=_optional(row['pe_ratio']),
+            dividend_yield=_optional(row['dividend_yield']),
+            week_52_high=_optional(row['week_52_high']),
+            week_52_low=_optional(row['week_52_low']),
+            last_updated=_text(row['last_updated']),
+            exchange=_text(row['exchange']),
+            company_name=_text(row['company_name'])
+        )
+        expires_in = catch_up_seconds * (position + 1) / total
+        quote_cache.prime(quote.symbol, quote, float(row['fetched_at']), expires_in)
+
+    for row in indicators:
+        quote_cache.prime(_text(row['key']), float(row['value']), float(row['fetched_at']),
+                          catch_up_seconds)
+
+    return len(quotes) + len(indicators)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Startup benchmark for Enhanced Stock Watchlist Application
+Measures cold import time of the app in fresh interpreters, the cost of
+building a StockManager and of serving the first request, and checks them
+against an import-time budget.
+
+Usage:
+    python startup_benchmark.py
+    python startup_benchmark.py --module stock_manager --budget-ms 300
+
+Exits with status 1 if the budget is exceeded or a provider SDK is
+imported eagerly, so it can run as a CI gate.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# These must only be imported when data is actually fetched
+LAZY_MODULES = ('yfinance', 'pandas', 'finnhub', 'alpha_vantage')
+
+
+def measure_import(module):
+    """Import `module` in a fresh interpreter; return (wall seconds, importtime rows, eager modules)"""
+    probe = (
+        "import sys, json\n"
+        f"import {module}\n"
+        f"print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))\n"
+    )
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+
+    eager = result.stdout.strip().splitlines()[-1]
+    return elapsed, rows, eager
+
+
+def measure_first_request():
+    """Time StockManager construction and the first /alerts render in-process"""
+    started = time.perf_counter()
+    from stock_manager import StockManager
+    StockManager()
+    manager_time = time.perf_counter() - started
+
+    from app import app
+    client = app.test_client()
+    started = time.perf_counter()
+    response = client.get("/alerts")
+    request_time = time.perf_counter() - started
+    return manager_time, request_time, response.status_code
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup benchmark and import-time budget check")
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float,
+                        default=float(os.getenv('IMPORT_TIME_BUDGET_MS', 1500)))
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    timings = []
+    rows = []
+    eager = "[]"
+    for _ in range(args.runs):
+        elapsed, rows, eager = measure_import(args.module)
+        timings.append(elapsed)
+
+    module_us = next((c for c, _, name in rows if name.strip() == args.module), 0)
+    median_ms = statistics.median(timings) * 1000
+
+    print(f"Cold start of '{args.module}' over {args.runs} runs")
+    print(f"  interpreter + import: median {median_ms:.0f}ms  "
+          f"min {min(timings) * 1000:.0f}ms  max {max(timings) * 1000:.0f}ms")
+    print(f"  import {args.module}: {module_us / 1000:.0f}ms (python -X importtime)")
+
+    print("\nSlowest imports (cumulative)")
+    for cumulative_us, _, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f}ms  {name.strip()}")
+
+    manager_time, request_time, status = measure_first_request()
+    print(f"\nStockManager(): {manager_time * 1000:.1f}ms")
+    print(f"First GET /alerts: {request_time * 1000:.1f}ms (status {status})")
+
+    failed = False
+    if module_us / 1000 > args.budget_ms:
+        print(f"\nFAIL: import {args.module} took {module_us / 1000:.0f}ms, budget is {args.budget_ms:.0f}ms")
+        failed = True
+    if eager != "[]":
+        print(f"\nFAIL: provider modules imported at startup: {eager}")
+        failed = True
+    if status != 200:
+        print(f"\nFAIL: first GET /alerts returned status {status}")
+        failed = True
+    if not failed:
+        print(f"\nOK: within {args.budget_ms:.0f}ms budget, no provider SDKs imported eagerly, "
+              f"first request succeeded")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
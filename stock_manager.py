@@ -1,14 +1,22 @@
 import csv
-import yfinance as yf
-import requests
-import finnhub
 import os
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
-from alpha_vantage.timeseries import TimeSeries
+from typing import TYPE_CHECKING, Dict, List, Optional, Any
 from dataclasses import dataclass, asdict
 from enum import Enum
 
+from fetch_queue import FetchPriority
+
+# Provider SDKs (yfinance/pandas, finnhub, alpha_vantage) and numpy are
+# imported on first use so that importing this module stays cheap.
+if TYPE_CHECKING:
+    from chart_data import HistoryColumns
+    from quote_cache import QuoteCache
+
+
+class QuotaExceededError(Exception):
+    """Raised when a user's watchlist or alert limit would be exceeded"""
+
 
 class AlertType(Enum):
     PRICE_ABOVE = "price_above"
@@ -25,6 +33,64 @@ class AlertStatus(Enum):
     DISABLED = "disabled"
 
 
+# The market value each alert type is compared against
+ALERT_METRICS = {
+    AlertType.PRICE_ABOVE: 'price',
+    AlertType.PRICE_BELOW: 'price',
+    AlertType.PERCENTAGE_CHANGE: 'change_percent',
+    AlertType.VOLUME_SPIKE: 'volume',
+    AlertType.RSI_OVERSOLD: 'rsi',
+    AlertType.RSI_OVERBOUGHT: 'rsi',
+}
+
+
+# Daily RSI barely moves intraday, so it is cached like chart history rather than quotes
+RSI_CACHE_TTL = int(os.getenv('HISTORY_CACHE_TTL', 300))
+
+
+def _mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def parse_enum(enum_class, raw: str):
+    """Parse a stored enum value; older files hold the repr, e.g. 'AlertType.PRICE_ABOVE'"""
+    prefix = f"{enum_class.__name__}."
+    if raw.startswith(prefix):
+        return enum_class[raw[len(prefix):]]
+    return enum_class(raw)
+
+
+def evaluate_alert(alert_type: AlertType, threshold, price=None, change_percent=None,
+                   volume=None, rsi=None):
+    """Whether an alert condition holds.
+
+    Works on scalars for live checks and on numpy arrays (one column per
+    alert, thresholds broadcast) for backtests. A missing metric never triggers.
+    """
+    value = {'price': price, 'change_percent': change_percent,
+             'volume': volume, 'rsi': rsi}[ALERT_METRICS[alert_type]]
+    if value is None:
+        return False
+    
+    if alert_type == AlertType.PRICE_ABOVE:
+        return value >= threshold
+    elif alert_type == AlertType.PRICE_BELOW:
+        return value <= threshold
+    elif alert_type == AlertType.PERCENTAGE_CHANGE:
+        return abs(value) >= threshold
+    elif alert_type == AlertType.VOLUME_SPIKE:
+        # Simple volume spike detection (you can enhance this)
+        return value >= threshold
+    elif alert_type == AlertType.RSI_OVERSOLD:
+        return value <= threshold
+    elif alert_type == AlertType.RSI_OVERBOUGHT:
+        return value >= threshold
+    return False
+
+
 @dataclass
 class StockAlert:
     id: str
@@ -58,31 +124,80 @@ class StockData:
 
 
 class StockManager:
-    def __init__(self, csv_file="data/stocks.csv", alerts_file="data/alerts.csv"):
+    def __init__(self, csv_file="data/stocks.csv", alerts_file="data/alerts.csv",
+                 quote_cache: Optional["QuoteCache"] = None,
+                 max_stocks: Optional[int] = None, max_alerts: Optional[int] = None):
         self.csv_file = csv_file
         self.alerts_file = alerts_file
-        self.stocks = self.load_stocks()
-        self.alerts = self.load_alerts()
         
-        # Initialize API clients
-        self.finnhub_client = None
-        self.alpha_vantage_client = None
-        self._init_api_clients()
+        # Shared with other StockManagers so each symbol is fetched once per TTL
+        self.quote_cache = quote_cache
         
-        # Ensure data directory exists
-        os.makedirs("data", exist_ok=True)
+        # Per-user limits (None = unlimited)
+        self.max_stocks = max_stocks
+        self.max_alerts = max_alerts
+        
+        # Stores are read from disk on first access
+        self._stocks: Optional[List[Dict]] = None
+        self._alerts: Optional[List[StockAlert]] = None
+        # File modification times the loaded stores reflect
+        self._stocks_mtime: Optional[int] = None
+        self._alerts_mtime: Optional[int] = None
+        
+        # API clients are built on first access
+        self._finnhub_client = None
+        self._alpha_vantage_client = None
+        self._api_clients_initialized = False
+
+    @property
+    def stocks(self) -> List[Dict]:
+        if self._stocks is None:
+            self._stocks_mtime = _mtime(self.csv_file)
+            self._stocks = self.load_stocks()
+        return self._stocks
+
+    @stocks.setter
+    def stocks(self, value: List[Dict]):
+        self._stocks = value
+
+    @property
+    def alerts(self) -> List[StockAlert]:
+        if self._alerts is None:
+            self._alerts_mtime = _mtime(self.alerts_file)
+            self._alerts = self.load_alerts()
+        return self._alerts
+
+    @alerts.setter
+    def alerts(self, value: List[StockAlert]):
+        self._alerts = value
+
+    @property
+    def finnhub_client(self):
+        if not self._api_clients_initialized:
+            self._init_api_clients()
+        return self._finnhub_client
+
+    @property
+    def alpha_vantage_client(self):
+        if not self._api_clients_initialized:
+            self._init_api_clients()
+        return self._alpha_vantage_client
 
     def _init_api_clients(self):
         """Initialize external API clients if API keys are available"""
+        self._api_clients_initialized = True
         try:
+            import finnhub
+            from alpha_vantage.timeseries import TimeSeries
+            
             # Initialize Finnhub client (free tier available)
             finnhub_key = os.getenv('FINNHUB_API_KEY', 'demo')  # Use demo key if none provided
-            self.finnhub_client = finnhub.Client(api_key=finnhub_key)
+            self._finnhub_client = finnhub.Client(api_key=finnhub_key)
             
             # Initialize Alpha Vantage client (optional)
             alpha_vantage_key = os.getenv('ALPHA_VANTAGE_API_KEY')
             if alpha_vantage_key:
-                self.alpha_vantage_client = TimeSeries(key=alpha_vantage_key, output_format='pandas')
+                self._alpha_vantage_client = TimeSeries(key=alpha_vantage_key, output_format='pandas')
         except Exception as e:
             print(f"API initialization warning: {e}")
 
@@ -105,9 +220,9 @@ class StockManager:
                     alert = StockAlert(
                         id=row['id'],
                         symbol=row['symbol'],
-                        alert_type=AlertType(row['alert_type']),
+                        alert_type=parse_enum(AlertType, row['alert_type']),
                         threshold=float(row['threshold']),
-                        status=AlertStatus(row['status']),
+                        status=parse_enum(AlertStatus, row['status']),
                         created_at=row['created_at'],
                         triggered_at=row.get('triggered_at'),
                         sound_enabled=row.get('sound_enabled', 'True').lower() == 'true',
@@ -119,6 +234,18 @@ class StockManager:
         except FileNotFoundError:
             return []
 
+    def reload(self):
+        """Re-read stocks and alerts written by other worker processes"""
+        self._stocks = None
+        self._alerts = None
+
+    def reload_if_changed(self):
+        """Re-read only the files another process has written since they were loaded"""
+        if self._stocks is not None and _mtime(self.csv_file) != self._stocks_mtime:
+            self._stocks = None
+        if self._alerts is not None and _mtime(self.alerts_file) != self._alerts_mtime:
+            self._alerts = None
+
     def save_stocks(self):
         """Save stocks to CSV file"""
         fieldnames = ["symbol", "current_price", "previous_close", "day_change", 
@@ -126,10 +253,13 @@ class StockManager:
                      "dividend_yield", "week_52_high", "week_52_low", "last_updated",
                      "exchange", "company_name"]
         
+        # Directories are created on first write, so reads never leave anything behind
+        os.makedirs(os.path.dirname(self.csv_file) or ".", exist_ok=True)
         with open(self.csv_file, mode="w", newline="") as file:
             writer = csv.DictWriter(file, fieldnames=fieldnames)
             writer.writeheader()
             writer.writerows(self.stocks)
+        self._stocks_mtime = _mtime(self.csv_file)
 
     def save_alerts(self):
         """Save alerts to CSV file"""
@@ -137,15 +267,22 @@ class StockManager:
                      "created_at", "triggered_at", "sound_enabled", 
                      "notification_enabled", "message"]
         
+        os.makedirs(os.path.dirname(self.alerts_file) or ".", exist_ok=True)
         with open(self.alerts_file, mode="w", newline="") as file:
             writer = csv.DictWriter(file, fieldnames=fieldnames)
             writer.writeheader()
             for alert in self.alerts:
-                writer.writerow(asdict(alert))
+                row = asdict(alert)
+                row['alert_type'] = alert.alert_type.value
+                row['status'] = alert.status.value
+                writer.writerow(row)
+        self._alerts_mtime = _mtime(self.alerts_file)
 
     def fetch_comprehensive_stock_data(self, symbol: str) -> Optional[StockData]:
         """Fetch comprehensive stock data from multiple sources"""
         try:
+            import yfinance as yf
+            
             # Primary data from yfinance
             stock = yf.Ticker(symbol)
             info = stock.info
@@ -191,15 +328,26 @@ class StockManager:
             print(f"Error fetching comprehensive data for {symbol}: {e}")
             return None
 
-    def add_stock(self, symbol: str) -> bool:
-        """Add a stock to the watchlist"""
+    def get_quote(self, symbol: str, priority: FetchPriority = FetchPriority.BACKGROUND,
+                  timeout: Optional[float] = None) -> Optional[StockData]:
+        """Get current stock data, through the shared quote cache if there is one"""
+        if self.quote_cache is None:
+            return self.fetch_comprehensive_stock_data(symbol)
+        return self.quote_cache.get_or_fetch(symbol, self.fetch_comprehensive_stock_data,
+                                             priority=priority, timeout=timeout)
+
+    def add_stock(self, symbol: str, timeout: Optional[float] = None) -> bool:
+        """Add a stock to the watchlist; the quote is fetched at interactive priority"""
         symbol = symbol.upper()
         
         # Check if stock already exists
         if any(stock['symbol'] == symbol for stock in self.stocks):
             return False
+        
+        if self.max_stocks is not None and len(self.stocks) >= self.max_stocks:
+            raise QuotaExceededError(f"Watchlist limit of {self.max_stocks} stocks reached")
             
-        stock_data = self.fetch_comprehensive_stock_data(symbol)
+        stock_data = self.get_quote(symbol, FetchPriority.INTERACTIVE, timeout)
         if stock_data:
             self.stocks.append(asdict(stock_data))
             self.save_stocks()
@@ -221,6 +369,9 @@ class StockManager:
                   sound_enabled: bool = True, notification_enabled: bool = True,
                   message: str = "") -> str:
         """Add a new alert"""
+        if self.max_alerts is not None and len(self.get_active_alerts()) >= self.max_alerts:
+            raise QuotaExceededError(f"Alert limit of {self.max_alerts} active alerts reached")
+        
         alert_id = f"{symbol}_{alert_type.value}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         
         alert = StockAlert(
@@ -247,21 +398,21 @@ class StockManager:
             if alert.status != AlertStatus.ACTIVE:
                 continue
                 
-            stock_data = self.fetch_comprehensive_stock_data(alert.symbol)
+            stock_data = self.get_quote(alert.symbol)
             if not stock_data:
                 continue
-                
-            triggered = False
             
-            if alert.alert_type == AlertType.PRICE_ABOVE:
-                triggered = stock_data.current_price >= alert.threshold
-            elif alert.alert_type == AlertType.PRICE_BELOW:
-                triggered = stock_data.current_price <= alert.threshold
-            elif alert.alert_type == AlertType.PERCENTAGE_CHANGE:
-                triggered = abs(stock_data.day_change_percent) >= alert.threshold
-            elif alert.alert_type == AlertType.VOLUME_SPIKE:
-                # Simple volume spike detection (you can enhance this)
-                triggered = stock_data.volume >= alert.threshold
+            rsi = None
+            if ALERT_METRICS[alert.alert_type] == 'rsi':
+                rsi = self.get_rsi(alert.symbol)
+                
+            triggered = evaluate_alert(
+                alert.alert_type, alert.threshold,
+                price=stock_data.current_price,
+                change_percent=stock_data.day_change_percent,
+                volume=stock_data.volume,
+                rsi=rsi
+            )
                 
             if triggered:
                 alert.status = AlertStatus.TRIGGERED
@@ -278,7 +429,7 @@ class StockManager:
         updated_stocks = []
         
         for stock in self.stocks:
-            stock_data = self.fetch_comprehensive_stock_data(stock['symbol'])
+            stock_data = self.get_quote(stock['symbol'])
             if stock_data:
                 updated_stocks.append(asdict(stock_data))
             else:
@@ -305,27 +456,62 @@ class StockManager:
                 return True
         return False
 
-    def get_stock_history(self, symbol: str, period: str = "1mo") -> Optional[Dict]:
-        """Get historical stock data"""
+    def get_history_columns(self, symbol: str, period: str = "1mo",
+                            max_points: Optional[int] = None) -> Optional["HistoryColumns"]:
+        """Get historical closes and volumes as columns, downsampled to max_points"""
         try:
+            import yfinance as yf
+            from chart_data import HistoryColumns
+            
             stock = yf.Ticker(symbol)
             hist = stock.history(period=period)
             
             if hist.empty:
                 return None
-                
-            # Convert to dict format for JSON serialization
-            history_data = {
-                'dates': [date.strftime('%Y-%m-%d') for date in hist.index],
-                'prices': [round(price, 2) for price in hist['Close'].tolist()],
-                'volumes': [int(vol) for vol in hist['Volume'].tolist()]
-            }
             
-            return history_data
+            index = hist.index.tz_localize(None) if hist.index.tz is not None else hist.index
+            columns = HistoryColumns(
+                dates=index.values.astype('datetime64[D]'),
+                prices=hist['Close'].to_numpy(dtype='float64'),
+                volumes=hist['Volume'].to_numpy(dtype='float64')
+            )
+            return columns.downsample(max_points)
         except Exception as e:
             print(f"Error fetching history for {symbol}: {e}")
             return None
 
+    def get_ohlcv(self, symbol: str, period: str = "1y", interval: str = "1d"):
+        """Get OHLCV bars as a DataFrame indexed by date, or None"""
+        try:
+            import yfinance as yf
+            
+            hist = yf.Ticker(symbol).history(period=period, interval=interval, auto_adjust=False)
+            if hist.empty:
+                return None
+            return hist[['Open', 'High', 'Low', 'Close', 'Volume']]
+        except Exception as e:
+            print(f"Error fetching OHLCV history for {symbol}: {e}")
+            return None
+
+    def get_rsi(self, symbol: str, period: int = 14) -> Optional[float]:
+        """Latest RSI from daily closes, shared through the quote cache"""
+        if self.quote_cache is None:
+            return self._fetch_rsi(symbol, period)
+        return self.quote_cache.get_or_fetch(f"{symbol}:RSI{period}",
+                                             lambda _: self._fetch_rsi(symbol, period),
+                                             ttl=RSI_CACHE_TTL)
+
+    def _fetch_rsi(self, symbol: str, period: int) -> Optional[float]:
+        history = self.get_history_columns(symbol, "6mo")
+        if history is None:
+            return None
+        
+        import pandas as pd
+        from indicators import compute_rsi
+        
+        value = compute_rsi(pd.Series(history.prices), period).iloc[-1]
+        return None if pd.isna(value) else round(float(value), 2)
+
     def search_stocks(self, query: str) -> List[Dict]:
         """Search for stocks by symbol or company name"""
         try:
@@ -336,6 +522,7 @@ class StockManager:
             
             # Try to get ticker info
             try:
+                import yfinance as yf
                 ticker = yf.Ticker(query)
                 info = ticker.info
                 if info and 'longName' in info:
@@ -0,0 +1,116 @@
+import hashlib
+import os
+import re
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from concurrency import native_lock
+from quote_cache import QuoteCache
+from stock_manager import StockManager
+
+
+# The default tenant keeps using the original single-user files
+DEFAULT_TENANT = "default"
+TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_@-][A-Za-z0-9_.@-]{0,63}$")
+
+
+class TenantRegistry:
+    """Per-user StockManagers with storage sharded on disk.
+
+    Tenant files live under data/tenants/<shard>/<tenant_id>/, where the shard
+    is the first two hex digits of a hash of the id. All managers share one
+    QuoteCache, so a symbol watched by many users is fetched once per TTL.
+    """
+
+    def __init__(self, data_dir: str = "data", quote_cache: Optional[QuoteCache] = None,
+                 max_stocks: Optional[int] = None, max_alerts: Optional[int] = None,
+                 max_loaded: int = 1000):
+        self.data_dir = data_dir
+        self.quote_cache = quote_cache or QuoteCache()
+        self.max_stocks = max_stocks
+        self.max_alerts = max_alerts
+        self.max_loaded = max_loaded
+        self._managers: "OrderedDict[str, StockManager]" = OrderedDict()
+        # Managers a background pass is using right now, loaded or not, so get()
+        # hands out the same instance instead of one that could overwrite it
+        self._in_use: Dict[str, StockManager] = {}
+        # Also taken from native threads, e.g. snapshot writes via call_provider
+        self._lock = native_lock()
+
+    @staticmethod
+    def validate(tenant_id: str) -> str:
+        """Check that a tenant id is safe to use as a directory name"""
+        if not tenant_id or not TENANT_ID_PATTERN.match(tenant_id):
+            raise ValueError(f"Invalid tenant id: {tenant_id!r}")
+        return tenant_id
+
+    def shard_for(self, tenant_id: str) -> str:
+        return hashlib.sha1(tenant_id.encode("utf-8")).hexdigest()[:2]
+
+    def paths_for(self, tenant_id: str) -> Tuple[str, str]:
+        """Get the (stocks, alerts) CSV paths for a tenant"""
+        if tenant_id == DEFAULT_TENANT:
+            return (os.path.join(self.data_dir, "stocks.csv"),
+                    os.path.join(self.data_dir, "alerts.csv"))
+        tenant_dir = os.path.join(self.data_dir, "tenants", self.shard_for(tenant_id), tenant_id)
+        return (os.path.join(tenant_dir, "stocks.csv"),
+                os.path.join(tenant_dir, "alerts.csv"))
+
+    def get(self, tenant_id: str = DEFAULT_TENANT) -> StockManager:
+        """Get (or lazily create) the StockManager for a tenant"""
+        self.validate(tenant_id)
+        with self._lock:
+            manager = self._managers.get(tenant_id)
+            if manager is None:
+                manager = self._in_use.get(tenant_id) or self._create(tenant_id)
+                self._managers[tenant_id] = manager
+                # Evicted managers lose nothing: every mutation is already on disk
+                while len(self._managers) > self.max_loaded:
+                    self._managers.popitem(last=False)
+            self._managers.move_to_end(tenant_id)
+            return manager
+
+    def _create(self, tenant_id: str) -> StockManager:
+        stocks_file, alerts_file = self.paths_for(tenant_id)
+        return StockManager(csv_file=stocks_file, alerts_file=alerts_file,
+                            quote_cache=self.quote_cache,
+                            max_stocks=self.max_stocks, max_alerts=self.max_alerts)
+
+    def tenant_ids(self) -> List[str]:
+        """All tenants that have saved stocks or alerts, plus the default tenant"""
+        tenant_ids = [DEFAULT_TENANT]
+        tenants_dir = os.path.join(self.data_dir, "tenants")
+        if os.path.isdir(tenants_dir):
+            for shard in sorted(os.listdir(tenants_dir)):
+                shard_dir = os.path.join(tenants_dir, shard)
+                if not os.path.isdir(shard_dir):
+                    continue
+                for tenant_id in sorted(os.listdir(shard_dir)):
+                    tenant_dir = os.path.join(shard_dir, tenant_id)
+                    if any(os.path.exists(os.path.join(tenant_dir, name))
+                           for name in ("stocks.csv", "alerts.csv")):
+                        tenant_ids.append(tenant_id)
+        return tenant_ids
+
+    def managers(self) -> Iterator[Tuple[str, StockManager]]:
+        """Iterate over every tenant's StockManager for background work.
+
+        Tenants that aren't loaded get a short-lived manager that is not added
+        to the LRU, so a pass over many tenants doesn't evict active ones.
+        """
+        for tenant_id in self.tenant_ids():
+            with self._lock:
+                manager = (self._managers.get(tenant_id) or self._in_use.get(tenant_id)
+                           or self._create(tenant_id))
+                self._in_use[tenant_id] = manager
+            try:
+                yield tenant_id, manager
+            finally:
+                with self._lock:
+                    self._in_use.pop(tenant_id, None)
+
+    def reload_all(self):
+        """Drop cached stores so every manager re-reads its files"""
+        with self._lock:
+            for manager in self._managers.values():
+                manager.reload()
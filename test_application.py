@@ -5,10 +5,23 @@ Test script for Enhanced Stock Watchlist Application
 This script demonstrates the core functionality and can be used for testing.
 """
 
+import json
+import os
+import subprocess
+import sys
+import threading
 import time
+
 import requests
-import json
-from stock_manager import StockManager
+from flask import Flask
+
+from export import export_chunks, history_rows, alert_rows, HISTORY_COLUMNS, ALERT_COLUMNS
+from fetch_queue import FetchQueue, FetchPriority, FetchTimeoutError
+from message_bus import LocalMessageBus
+from quote_cache import QuoteCache
+from response_cache import ResponseCache
+from stock_manager import StockManager, StockData, AlertType, AlertStatus, QuotaExceededError
+from tenants import TenantRegistry
 
 def test_stock_manager():
     """Test the StockManager functionality"""
@@ -148,6 +161,340 @@ def test_create_sample_alerts():
     
     return True
 
+def test_call_provider_offloads_under_eventlet():
+    """serve.py patches for eventlet and call_provider runs calls on a native thread"""
+    script = (
+        'import serve, app; '
+        'from eventlet.patcher import original; '
+        'get_ident = original("_thread").get_ident; '
+        'assert app.socketio.async_mode == "eventlet"; '
+        'assert app.call_provider(get_ident) != get_ident(); '
+        'assert app.call_provider(divmod, 7, 2) == (3, 1); '
+        'assert serve.raise_open_file_limit() >= 1024'
+    )
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, timeout=60,
+                            env={**os.environ, 'SOCKETIO_ASYNC_MODE': 'eventlet'})
+    assert result.returncode == 0, result.stderr
+    
+    script = 'import app, threading; assert app.call_provider(threading.get_ident) == threading.get_ident()'
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, timeout=60,
+                            env={**os.environ, 'SOCKETIO_ASYNC_MODE': 'threading'})
+    assert result.returncode == 0, result.stderr
+
+def test_message_bus_leader_election():
+    """Only one worker at a time should hold the fetcher lease"""
+    bus = LocalMessageBus(distributed=True)
+    
+    assert bus.acquire_leadership('worker-1', ttl=60)
+    assert not bus.acquire_leadership('worker-2', ttl=60)
+    assert bus.acquire_leadership('worker-1', ttl=60)  # renewal
+    
+    # An expired lease is taken over by the next worker
+    bus.acquire_leadership('worker-1', ttl=0)
+    assert bus.acquire_leadership('worker-2', ttl=60)
+    
+    bus.release_leadership('worker-2')
+    assert bus.acquire_leadership('worker-3', ttl=60)
+    
+    bus.publish_snapshot('stocks', [{'symbol': 'AAPL'}])
+    assert bus.get_snapshot('stocks') == [{'symbol': 'AAPL'}]
+    assert bus.get_snapshot('missing') is None
+
+def test_web_worker_serves_published_snapshot(tmp_path, monkeypatch):
+    """A web worker answers from the fetcher's snapshot without calling providers"""
+    import app
+    
+    def fetch(self, symbol):
+        raise AssertionError("web workers must not call providers")
+    
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(StockManager, 'fetch_comprehensive_stock_data', fetch)
+    monkeypatch.setattr(app, 'message_bus', LocalMessageBus(distributed=True))
+    monkeypatch.setattr(app, 'WORKER_ROLE', 'web')
+    
+    stocks = [{'symbol': 'AAPL', 'current_price': 190.5}]
+    app.message_bus.publish_snapshot('stocks:webworker', stocks)
+    response = app.app.test_client().get('/api/watchlist', headers={'X-User-Id': 'webworker'})
+    assert response.status_code == 200
+    assert response.get_json() == stocks
+    assert not app.is_fetcher()
+
+def test_alerts_survive_reload(tmp_path):
+    """Saved alerts are re-read with their enum values intact"""
+    manager = StockManager(csv_file=str(tmp_path / 'stocks.csv'),
+                           alerts_file=str(tmp_path / 'alerts.csv'))
+    alert_id = manager.add_alert('AAPL', AlertType.PRICE_ABOVE, 200.0)
+    
+    with open(manager.alerts_file) as file:
+        assert 'price_above' in file.read()
+    
+    manager.reload()
+    assert [(a.id, a.alert_type, a.status) for a in manager.alerts] == \
+        [(alert_id, AlertType.PRICE_ABOVE, AlertStatus.ACTIVE)]
+    
+    # Another worker triggers the alert; reads pick it up only once the file changes
+    other = StockManager(csv_file=manager.csv_file, alerts_file=manager.alerts_file)
+    other.alerts[0].status = AlertStatus.TRIGGERED
+    loaded = manager.alerts
+    manager.reload_if_changed()
+    assert manager.alerts is loaded
+    other.save_alerts()
+    manager.reload_if_changed()
+    assert manager.alerts[0].status == AlertStatus.TRIGGERED
+
+def test_response_cache_etags():
+    """Unchanged payloads keep their ETag and revalidate with a 304"""
+    cache = ResponseCache()
+    payload = [{'symbol': f'S{i}', 'current_price': float(i)} for i in range(100)]
+    entry = cache.put('watchlist', payload, ttl=30)
+    assert cache.put('watchlist', list(payload), ttl=30).etag == entry.etag
+    
+    app = Flask(__name__)
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+        from flask import request
+        response = cache.respond(entry, request)
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'max-age=' in response.headers['Cache-Control']
+    
+    with app.test_request_context(headers={'If-None-Match': f'W/"{entry.etag}"'}):
+        from flask import request
+        assert cache.respond(entry, request).status_code == 304
+    
+    cache.invalidate('watchlist')
+    assert cache.get('watchlist') is None
+
+def test_history_downsampling():
+    """LTTB keeps the endpoints and total volume while capping the point count"""
+    import numpy as np
+    from chart_data import HistoryColumns
+    
+    count = 2000
+    history = HistoryColumns(
+        dates=np.datetime64('2015-01-01') + np.arange(count),
+        prices=100 + np.sin(np.arange(count) / 50.0) * 10,
+        volumes=np.full(count, 1000.0)
+    )
+    
+    reduced = history.downsample(250)
+    assert len(reduced) == 250
+    assert reduced.dates[0] == history.dates[0]
+    assert reduced.dates[-1] == history.dates[-1]
+    assert reduced.volumes.sum() == history.volumes.sum()
+    assert history.downsample(None) is history
+    
+    data = reduced.to_dict()
+    assert data['dates'][0] == '2015-01-01'
+    assert len(reduced.to_bytes()) == 8 + 16 * 250
+
+def test_provider_sdks_imported_lazily():
+    """Importing the app must not pull in yfinance/pandas or the API clients"""
+    result = subprocess.run(
+        [sys.executable, '-c',
+         'import sys, app; '
+         'print(",".join(m for m in ("yfinance", "pandas", "finnhub", "alpha_vantage") if m in sys.modules))'],
+        capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ''
+
+def test_tenants_share_quotes(tmp_path, monkeypatch):
+    """Many tenants watching one symbol cost a single upstream fetch"""
+    fetched = []
+    quote = StockData(symbol='AAPL', current_price=190.5, previous_close=188.0,
+                      day_change=2.5, day_change_percent=1.33, volume=1000,
+                      market_cap=None, pe_ratio=None, dividend_yield=None,
+                      week_52_high=None, week_52_low=None,
+                      last_updated='2026-10-19 10:00:00')
+    
+    def fetch(self, symbol):
+        fetched.append(symbol)
+        return quote
+    
+    monkeypatch.setattr(StockManager, 'fetch_comprehensive_stock_data', fetch)
+    registry = TenantRegistry(data_dir=str(tmp_path), quote_cache=QuoteCache(ttl=60), max_alerts=1)
+    users = [registry.get(f'user{i}') for i in range(500)]
+    for user in users:
+        user.add_alert('AAPL', AlertType.PRICE_ABOVE, 150.0)
+    
+    assert all(len(user.check_alerts()) == 1 for user in users)
+    assert all(user.get_quote('aapl') is quote for user in users)
+    assert fetched == ['AAPL']
+    
+    alice = registry.get('alice')
+    assert alice.csv_file.startswith(str(tmp_path / 'tenants'))
+    assert registry.get('bob').csv_file != alice.csv_file
+    
+    alice.add_alert('AAPL', AlertType.PRICE_ABOVE, 200.0)
+    try:
+        alice.add_alert('AAPL', AlertType.PRICE_BELOW, 50.0)
+        assert False, "alert quota was not enforced"
+    except QuotaExceededError:
+        pass
+    
+    # Tenants that only read (bob) leave nothing on disk and are not listed
+    assert {'default', 'alice', 'user0'} <= set(registry.tenant_ids())
+    assert 'bob' not in registry.tenant_ids()
+    assert len(registry.tenant_ids()) == 502
+    assert not os.path.exists(os.path.dirname(registry.get('bob').csv_file))
+    
+    # Evicted managers are re-created from disk with their alerts intact
+    small = TenantRegistry(data_dir=str(tmp_path), max_loaded=1)
+    small.get('bob')
+    reloaded = small.get('alice')
+    assert reloaded is not alice
+    
+    # Background passes don't churn the LRU, and get() shares the instance in use
+    small.get('bob')
+    for tenant_id, manager in small.managers():
+        if tenant_id == 'alice':
+            assert small.get('alice') is manager
+    assert list(small._managers) == ['alice']
+    assert [(a.symbol, a.alert_type) for a in reloaded.alerts] == [('AAPL', AlertType.PRICE_ABOVE)]
+    try:
+        registry.get('../etc')
+        assert False, "unsafe tenant id was accepted"
+    except ValueError:
+        pass
+
+def test_backtest_counts_triggers():
+    """Backtests count each bar where an alert condition starts to hold"""
+    import pandas as pd
+    from backtest import AlertBacktester, parse_alert
+    
+    dates = pd.bdate_range('2024-01-01', periods=6)
+    close = pd.DataFrame({'AAPL': [100, 105, 99, 106, 107, 98],
+                          'MSFT': [300, 300, 300, 300, 300, 300]}, index=dates)
+    volume = pd.DataFrame({'AAPL': [1e6] * 6, 'MSFT': [1e6, 5e6, 1e6, 1e6, 6e6, 7e6]}, index=dates)
+    backtester = AlertBacktester(close, volume)
+    
+    above, spike, missing = backtester.run([
+        parse_alert('AAPL:price_above:104'),
+        parse_alert('MSFT:volume_spike:4000000'),
+        parse_alert('TSLA:price_below:1'),
+    ])
+    assert above.trigger_count == 2
+    assert above.trigger_dates == ['2024-01-02', '2024-01-04']
+    assert spike.trigger_count == 2
+    assert spike.first_triggered_at == '2024-01-02'
+    assert missing.trigger_count == 0 and missing.first_triggered_at is None
+
+def test_snapshot_round_trip(tmp_path):
+    """Quotes and indicators survive a snapshot and restore"""
+    from snapshot import save_state, restore_state
+    
+    cache = QuoteCache(ttl=60)
+    quote = StockData(symbol='AAPL', current_price=190.5, previous_close=188.0,
+                      day_change=2.5, day_change_percent=1.33, volume=1000,
+                      market_cap=3e12, pe_ratio=None, dividend_yield=None,
+                      week_52_high=199.6, week_52_low=164.1,
+                      last_updated='2026-10-19 10:00:00', exchange='NMS',
+                      company_name='Apple Inc.')
+    cache.get_or_fetch('AAPL', lambda symbol: quote)
+    cache.get_or_fetch('AAPL:RSI14', lambda symbol: 55.2)
+    
+    path = str(tmp_path / 'state.snapshot')
+    save_state(path, cache)
+    
+    restored = QuoteCache(ttl=60)
+    assert restore_state(path, restored, catch_up_seconds=60) == 2
+    assert restored.get_or_fetch('AAPL', lambda symbol: None) == quote
+    assert restored.get_or_fetch('AAPL:RSI14', lambda symbol: None) == 55.2
+
+def test_fetch_queue_priority_and_coalescing():
+    """Interactive fetches jump the queue and duplicate fetches share one call"""
+    queue = FetchQueue(workers=1, reserved_interactive=0)
+    gate = threading.Event()
+    order = []
+    
+    def fetch(key):
+        order.append(key)
+        return key
+    
+    queue.submit('busy', gate.wait)
+    background = [queue.submit(f'bg{i}', fetch, f'bg{i}') for i in range(3)]
+    interactive = queue.submit('quote:AAPL', fetch, 'AAPL', priority=FetchPriority.INTERACTIVE)
+    duplicate = queue.submit('quote:AAPL', fetch, 'AAPL', priority=FetchPriority.INTERACTIVE)
+    expired = queue.submit('slow', fetch, 'slow', timeout=0.01)
+    assert duplicate is interactive
+    
+    time.sleep(0.05)
+    gate.set()
+    assert interactive.result(timeout=5) == 'AAPL'
+    assert [future.result(timeout=5) for future in background] == ['bg0', 'bg1', 'bg2']
+    try:
+        expired.result(timeout=5)
+        assert False, "expired fetch was not cancelled"
+    except FetchTimeoutError:
+        pass
+    assert order == ['AAPL', 'bg0', 'bg1', 'bg2']
+
+def test_fetch_queue_background_latency():
+    """Background calls on an idle queue start right away, not after a poll"""
+    queue = FetchQueue(workers=4, reserved_interactive=1)
+    latencies = []
+    for i in range(40):
+        started = time.monotonic()
+        assert queue.call(f'bg{i}', lambda value: value, i) == i
+        latencies.append(time.monotonic() - started)
+    assert max(latencies) < 0.1
+    assert sum(latencies) < 0.5
+
+def test_export_streams_in_chunks(tmp_path):
+    """Exports encode rows lazily, a chunk at a time"""
+    import numpy as np
+    import pandas as pd
+    
+    fetched = []
+    
+    def fetch(symbol):
+        fetched.append(symbol)
+        dates = pd.bdate_range('2024-01-01', periods=5)
+        return pd.DataFrame({'Open': 1.0, 'High': 2.0, 'Low': 0.5, 'Close': [1.0, 1.1, 1.2, 1.3, np.nan],
+                             'Volume': 1000}, index=dates)
+    
+    chunks = export_chunks(history_rows(['aapl', 'msft'], fetch), HISTORY_COLUMNS, 'csv', chunk_rows=2)
+    first = next(chunks)
+    assert first.startswith(b'symbol,date,open,high,low,close,volume\r\nAAPL,2024-01-01')
+    assert fetched == ['AAPL']
+    
+    lines = (first + b''.join(chunks)).decode().splitlines()
+    assert len(lines) == 11
+    assert lines[5] == 'AAPL,2024-01-05T00:00:00,1.0,2.0,0.5,,1000'
+    
+    ndjson = b''.join(export_chunks(history_rows(['aapl'], fetch), HISTORY_COLUMNS, 'ndjson'))
+    assert json.loads(ndjson.splitlines()[-1])['close'] is None
+    
+    manager = StockManager(csv_file=str(tmp_path / 'stocks.csv'),
+                           alerts_file=str(tmp_path / 'alerts.csv'))
+    manager.add_alert('AAPL', AlertType.RSI_OVERSOLD, 30.0)
+    alert = json.loads(b''.join(export_chunks(alert_rows(manager), ALERT_COLUMNS, 'ndjson')))
+    assert (alert['symbol'], alert['alert_type'], alert['status']) == ('AAPL', 'rsi_oversold', 'active')
+    assert alert['threshold'] == 30.0 and alert['sound_enabled'] is True
+    try:
+        export_chunks(iter([]), HISTORY_COLUMNS, 'xml')
+        assert False, "unknown format was accepted"
+    except ValueError:
+        pass
+
+def test_export_parquet_round_trip():
+    """Parquet exports stream one row group per chunk and read back intact"""
+    import io
+    import pytest
+    pq = pytest.importorskip('pyarrow.parquet')
+    
+    rows = [('AAPL', f'2024-01-{day:02d}T00:00:00', 1.0, 2.0, 0.5, float(day), 1000 * day)
+            for day in range(1, 8)]
+    rows.append(('MSFT', '2024-01-08T00:00:00', None, None, None, None, None))
+    chunks = list(export_chunks(iter(rows), HISTORY_COLUMNS, 'parquet', chunk_rows=3))
+    assert len(chunks) > 3
+    
+    parquet_file = pq.ParquetFile(io.BytesIO(b''.join(chunks)))
+    assert parquet_file.num_row_groups == 3
+    assert parquet_file.schema_arrow.names == [name for name, _ in HISTORY_COLUMNS]
+    table = parquet_file.read()
+    assert [tuple(row.values()) for row in table.to_pylist()] == rows
+
 def main():
     """Main test function"""
     print("Enhanced Stock Watchlist Application Test Suite")